@@ -10,6 +10,7 @@ MONGO_DB = os.getenv("MONGO_DB")
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_VERIFY_SID = os.getenv("TWILIO_VERIFY_SID")
+TWILIO_SMS_FROM = os.getenv("TWILIO_SMS_FROM")
 
 PHONE_JWT_SECRET = os.getenv("PHONE_JWT_SECRET")
 
@@ -25,4 +26,75 @@ AWS_REGION = os.getenv("AWS_REGION")
 RESET_TOKEN_EXPIRE_MINUTES = int(os.getenv("RESET_TOKEN_EXPIRE_MINUTES", "60"))
 
 SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
-SENDGRID_FROM_EMAIL = os.getenv("SENDGRID_FROM_EMAIL")
\ No newline at end of file
+SENDGRID_FROM_EMAIL = os.getenv("SENDGRID_FROM_EMAIL")
+
+ENTITY_CACHE_MAX_BYTES = int(os.getenv("ENTITY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+ENTITY_CACHE_TTL_SECONDS = int(os.getenv("ENTITY_CACHE_TTL_SECONDS", "60"))
+
+ASSIGNMENT_ACTIVE_HOURS = int(os.getenv("ASSIGNMENT_ACTIVE_HOURS", "24"))
+COMPACTION_BATCH_SIZE = int(os.getenv("COMPACTION_BATCH_SIZE", "200"))
+COMPACTION_MAX_BATCHES = int(os.getenv("COMPACTION_MAX_BATCHES", "50"))
+COMPACTION_PAUSE_SECONDS = float(os.getenv("COMPACTION_PAUSE_SECONDS", "1"))
+HISTORY_RETENTION_DAYS = int(os.getenv("HISTORY_RETENTION_DAYS", "30"))
+
+# Expiring history is exported here before its partition is dropped. ARCHIVE_DIR (a local
+# directory) takes precedence over the S3 bucket.
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR")
+ARCHIVE_S3_BUCKET = os.getenv("ARCHIVE_S3_BUCKET", os.getenv("S3_BUCKET_NAME"))
+ARCHIVE_COMPRESSION = os.getenv("ARCHIVE_COMPRESSION", "gzip")
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+
+# Days before expiry at which a document is included in the company's daily digest
+# (0 = on/after expiry). Expired documents are looked back on for LOOKBACK days.
+EXPIRY_REMINDER_DAYS = sorted({int(d) for d in os.getenv("EXPIRY_REMINDER_DAYS", "30,7,1,0").split(",") if d.strip()})
+EXPIRY_REMINDER_LOOKBACK_DAYS = int(os.getenv("EXPIRY_REMINDER_LOOKBACK_DAYS", "30"))
+EXPIRY_REMINDER_WORKERS = int(os.getenv("EXPIRY_REMINDER_WORKERS", "8"))
+EXPIRY_REMINDER_SMS = os.getenv("EXPIRY_REMINDER_SMS", "false").lower() == "true"
+
+# Email outbox: messages are queued in Mongo and sent by EMAIL_WORKERS threads per process.
+EMAIL_WORKERS = int(os.getenv("EMAIL_WORKERS", "4"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "8"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+EMAIL_SEND_TIMEOUT_SECONDS = float(os.getenv("EMAIL_SEND_TIMEOUT_SECONDS", "10"))
+EMAIL_OUTBOX_POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "2"))
+# Encoded attachment bytes allowed per email; documents beyond it are sent as S3 links
+# valid for EMAIL_LINK_EXPIRY_SECONDS (at most 7 days for presigned URLs). Queued
+# messages are stored in Mongo, so this must stay well under the 16 MB document limit.
+EMAIL_ATTACHMENT_BUDGET_BYTES = int(os.getenv("EMAIL_ATTACHMENT_BUDGET_BYTES", str(10 * 1024 * 1024)))
+EMAIL_LINK_EXPIRY_SECONDS = int(os.getenv("EMAIL_LINK_EXPIRY_SECONDS", str(7 * 24 * 3600)))
+
+# Truck/driver update emails are merged per entity: changes within NOTIFY_WINDOW_SECONDS
+# of the first one go out as one email, or sooner once NOTIFY_MAX_CHANGES have piled up.
+NOTIFY_WINDOW_SECONDS = int(os.getenv("NOTIFY_WINDOW_SECONDS", "120"))
+NOTIFY_MAX_CHANGES = int(os.getenv("NOTIFY_MAX_CHANGES", "10"))
+NOTIFY_FLUSH_SECONDS = int(os.getenv("NOTIFY_FLUSH_SECONDS", "30"))
+
+# Password hashing: bcrypt work factor for new hashes (existing ones are upgraded on
+# login), threads in the hashing pool, and calls allowed to queue before returning 503.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+# OTP delivery: "twilio" (Twilio Verify), "local" (codes issued and checked here, sent
+# as plain SMS from TWILIO_SMS_FROM) or "memory" (in-process codes for tests and load
+# tests; every code is OTP_MEMORY_CODE). Twilio calls time out after
+# OTP_TIMEOUT_SECONDS and transient failures are retried OTP_RETRIES times.
+OTP_PROVIDER = os.getenv("OTP_PROVIDER", "twilio").lower()
+OTP_TIMEOUT_SECONDS = float(os.getenv("OTP_TIMEOUT_SECONDS", "5"))
+OTP_RETRIES = int(os.getenv("OTP_RETRIES", "2"))
+OTP_MEMORY_CODE = os.getenv("OTP_MEMORY_CODE", "123456")
+OTP_MEMORY_LATENCY_MS = float(os.getenv("OTP_MEMORY_LATENCY_MS", "0"))
+# Local OTPs: codes are OTP_LENGTH digits, valid for OTP_TTL_SECONDS and locked after
+# OTP_MAX_ATTEMPTS wrong guesses. Stored hashes are keyed with OTP_SECRET.
+OTP_SECRET = os.getenv("OTP_SECRET", JWT_SECRET_KEY or "")
+OTP_LENGTH = int(os.getenv("OTP_LENGTH", "6"))
+OTP_TTL_SECONDS = int(os.getenv("OTP_TTL_SECONDS", "600"))
+OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", "5"))
+# A phone gets at most one OTP SMS per OTP_RESEND_WINDOW_SECONDS; repeats within it
+# are answered with "already sent".
+OTP_RESEND_WINDOW_SECONDS = int(os.getenv("OTP_RESEND_WINDOW_SECONDS", "30"))
+
+# Logins resolve usernames/emails through the identities collection. Turn this on only
+# until scripts/backfill_identities.py has run; it makes unknown identifiers fall back
+# to scanning admins and companies.
+IDENTITY_LEGACY_LOOKUP = os.getenv("IDENTITY_LEGACY_LOOKUP", "false").lower() == "true"
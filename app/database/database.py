@@ -1,12 +1,85 @@
 # database.py
 from pymongo import MongoClient
+from pymongo.errors import OperationFailure
 from dotenv import load_dotenv
+import logging
 import os
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 MONGO_URI = os.getenv("MONGO_URI")
 MONGO_DB = os.getenv("MONGO_DB")
 
 client = MongoClient(MONGO_URI)
 db = client[MONGO_DB]
+
+# Fields whose <field>_active_unique index could not be built at startup. Until the
+# index exists, assignment writes check for a conflicting active assignment themselves.
+missing_active_unique = set()
+
+def active_unique_enforced() -> bool:
+    return not missing_active_unique
+
+def ensure_indexes():
+    """
+    Creates the indexes the API relies on. create_index is a no-op when the index
+    already exists, so this is safe to run on every startup.
+    """
+    db.trucks.create_index([("company_id", 1), ("truck_number", 1), ("_id", 1)])
+    db.drivers.create_index([("company_id", 1), ("created_at", 1), ("_id", 1)])
+    for resources in (db.trucks, db.drivers):
+        resources.create_index([("company_id", 1), ("active_assignment_id", 1)])
+        resources.create_index([("company_id", 1), ("assigned_until", 1)])
+    db.assignments.create_index([("company_id", 1), ("status", 1), ("assignment_date", -1), ("_id", -1)])
+    # Background compaction looks for lapsed actives across all companies.
+    db.assignments.create_index([("status", 1), ("assignment_date", 1)])
+    # The utilization rollup scans for records written since its last watermark.
+    db.assignments.create_index([("updated_at", 1)])
+    db.utilization_daily.create_index([("company_id", 1), ("kind", 1), ("day", 1)])
+    db.utilization_daily.create_index([("company_id", 1), ("day", 1)])
+    # A truck or driver can be on at most one active assignment; the database enforces it.
+    # Should existing data violate the constraint (duplicate actives, or assignments still
+    # stored with the truckId/driverId aliases, which all index as null), the API starts
+    # without the index and create_assignment falls back to checking for conflicts first.
+    for field in ("truck_id", "driver_id"):
+        try:
+            db.assignments.create_index(
+                [(field, 1)],
+                name=f"{field}_active_unique",
+                unique=True,
+                partialFilterExpression={"status": "active"}
+            )
+            missing_active_unique.discard(field)
+        except OperationFailure as e:
+            missing_active_unique.add(field)
+            logger.error(
+                f"Could not build {field}_active_unique: {e}. Conflicts are checked before each insert "
+                f"instead; resolve duplicate active assignments and run scripts/backfill_availability.py "
+                f"so it can be enforced."
+            )
+    # Daily expiry reminders: one range scan over every tenant's document expiry dates,
+    # and markers of what was already sent, expired once they can no longer match.
+    for resources in (db.trucks, db.drivers):
+        resources.create_index([("document_expiries.date", 1)])
+    db.expiry_reminders_sent.create_index([("claimed_at", 1)], expireAfterSeconds=120 * 24 * 3600)
+    # Outbox workers claim due messages by status; sent messages expire after a week.
+    db.email_outbox.create_index([("status", 1), ("next_attempt_at", 1)])
+    db.email_outbox.create_index([("status", 1), ("locked_until", 1)])
+    db.email_outbox.create_index([("sent_at", 1)], expireAfterSeconds=7 * 24 * 3600)
+    # One open notification window per truck/driver; the flusher picks windows by flush_at.
+    db.pending_notifications.create_index(
+        [("company_id", 1), ("kind", 1), ("entity_id", 1)],
+        name="open_window_unique",
+        unique=True,
+        partialFilterExpression={"status": "open"}
+    )
+    db.pending_notifications.create_index([("flush_at", 1)])
+    # Locally issued OTPs (one per phone, by _id) are removed once they expire.
+    db.otp_codes.create_index([("expires_at", 1)], expireAfterSeconds=0)
+    db.otp_sends.create_index([("sent_at", 1)], expireAfterSeconds=3600)
+    # Login identifiers are looked up by _id; entries are dropped per owner.
+    db.identities.create_index([("role", 1), ("owner_id", 1)])
+    db.companies.create_index([("status", 1), ("_id", 1)])
+    db.contact_requests.create_index([("status", 1), ("submitted_at", -1), ("_id", -1)])
@@ -0,0 +1,33 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import date
+
+class LoadTypeCount(BaseModel):
+    type: str
+    count: int
+
+class RouteCount(BaseModel):
+    origin: Optional[str] = None
+    destination: Optional[str] = None
+    count: int
+
+class UtilizationPeriod(BaseModel):
+    """Utilization of one truck or driver over one period of the report."""
+    period_start: date
+    resource_id: str
+    active_hours: float
+    trips: int
+    utilization: float = Field(..., description="Share of the period's hours spent on assignments, 0 to 1.")
+    load_types: List[LoadTypeCount] = []
+    routes: List[RouteCount] = []
+
+class UtilizationReport(BaseModel):
+    """Model for API responses of the utilization report."""
+    from_date: date = Field(..., alias="from")
+    to_date: date = Field(..., alias="to")
+    granularity: str
+    kind: str
+    items: List[UtilizationPeriod]
+
+    class Config:
+        populate_by_name = True
@@ -1,9 +1,9 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from bson import ObjectId
-from app.models.truck import PyObjectId, TruckOut
-from app.models.driver import DriverOut
+from app.models.truck import PyObjectId, TruckOut, TruckSummary
+from app.models.driver import DriverOut, DriverSummary
 
 class AssignmentBase(BaseModel):
     """Core fields for creating an assignment."""
@@ -17,6 +17,25 @@ class AssignmentCreate(AssignmentBase):
     """Model for API request to create an assignment."""
     pass
 
+MAX_BULK_ASSIGNMENTS = 500
+
+class AssignmentBulkCreate(BaseModel):
+    """Model for API request to create many assignments at once."""
+    assignments: List[AssignmentCreate] = Field(..., min_length=1, max_length=MAX_BULK_ASSIGNMENTS)
+
+class AssignmentBulkItemResult(BaseModel):
+    """Outcome for one entry of a bulk request, matched by its position in the request."""
+    index: int
+    status: str = Field(..., description="'created', 'conflict' or 'not_found'.")
+    id: Optional[str] = None
+    detail: Optional[str] = None
+
+class AssignmentBulkResult(BaseModel):
+    """Model for API response of a bulk create."""
+    created: int
+    failed: int
+    results: List[AssignmentBulkItemResult]
+
 class AssignmentInDB(AssignmentBase):
     """Model for data as stored in MongoDB."""
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
@@ -43,3 +62,17 @@ class AssignmentOut(BaseModel):
     
     class Config:
         populate_by_name = True
+
+class AssignmentSummary(BaseModel):
+    """Assignment with only the truck and driver fields needed by list screens."""
+    id: str
+    truck: TruckSummary
+    driver: DriverSummary
+    status: str
+    assignment_date: datetime
+    completed_at: Optional[datetime] = None
+    origin: Optional[str] = None
+    destination: Optional[str] = None
+
+    class Config:
+        populate_by_name = True
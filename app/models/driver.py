@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field, EmailStr, model_validator
 from typing import Optional
 from datetime import date, datetime
 from bson import ObjectId
@@ -37,3 +37,37 @@ class DriverOut(DriverInDB):
 class DriverUpdate(BaseModel):
     """Model for updating a driver's phone number."""
     phone_number: str = Field(..., description="Driver's new 10-digit mobile number.")
+
+DRIVER_SUMMARY_PROJECTION = {
+    "_id": 1,
+    "first_name": 1,
+    "last_name": 1,
+    "phone_number": 1,
+    "driver_photo_url": 1,
+    "license.validity_nt": 1,
+    "license.validity_tr": 1,
+}
+
+class DriverSummary(BaseModel):
+    """Lightweight driver representation for list screens and dropdowns."""
+    id: PyObjectId = Field(alias="_id")
+    first_name: str
+    last_name: str
+    phone_number: Optional[str] = None
+    driver_photo_url: Optional[str] = None
+    nearest_expiry: Optional[date] = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def compute_nearest_expiry(cls, data):
+        if isinstance(data, dict) and "license" in data:
+            license = data["license"] or {}
+            expiries = [license.get("validity_nt"), license.get("validity_tr")]
+            expiries = [e.date() if isinstance(e, datetime) else e for e in expiries if e]
+            data = {k: v for k, v in data.items() if k != "license"}
+            data["nearest_expiry"] = min(expiries) if expiries else None
+        return data
+
+    class Config:
+        json_encoders = {ObjectId: str}
+        populate_by_name = True
@@ -0,0 +1,10 @@
+# app/models/pagination.py
+from pydantic import BaseModel
+from typing import Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+class Page(BaseModel, Generic[T]):
+    """A single page of a keyset-paginated listing."""
+    items: List[T]
+    next_cursor: Optional[str] = None
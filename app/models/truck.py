@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional, List
 from datetime import date, datetime
 from bson import ObjectId
@@ -6,22 +6,26 @@ from pydantic_core import core_schema
 
 class PyObjectId(ObjectId):
     @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
+    def __get_pydantic_core_schema__(cls, source_type, handler):
+        return core_schema.no_info_plain_validator_function(
+            cls.validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(str, when_used="json"),
+        )
     @classmethod
     def validate(cls, v):
+        if isinstance(v, ObjectId):
+            return v
         if not ObjectId.is_valid(v):
             raise ValueError("Invalid objectid")
         return ObjectId(v)
     @classmethod
-    def __get_pydantic_json_schema__(
-        cls, core_schema: core_schema.CoreSchema, handler
-    ):
-        return core_schema.StringSchema(
-            min_length=24,
-            max_length=24,
-            pattern='^[0-9a-fA-F]{24}$',
-        )
+    def __get_pydantic_json_schema__(cls, schema: core_schema.CoreSchema, handler):
+        return {
+            "type": "string",
+            "minLength": 24,
+            "maxLength": 24,
+            "pattern": "^[0-9a-fA-F]{24}$",
+        }
 
 class RCDetails(BaseModel):
     issue_date: Optional[date] = None
@@ -102,3 +106,43 @@ class TruckOut(TruckInDB):
     class Config:
         json_encoders = {ObjectId: str}
 
+TRUCK_DOC_EXPIRY_FIELDS = {
+    "rc": "expiry_date",
+    "puc": "expiry_date",
+    "tax": "expiry_date",
+    "insurance": "expiry_date",
+    "national_permit": "expiry_date",
+    "state_permit": "expiry_date",
+    "fitness": "main_expiry_date",
+}
+
+TRUCK_SUMMARY_PROJECTION = {
+    "_id": 1,
+    "truck_number": 1,
+    "truck_photo_url": 1,
+    **{f"documents.{doc}.{key}": 1 for doc, key in TRUCK_DOC_EXPIRY_FIELDS.items()},
+}
+
+class TruckSummary(BaseModel):
+    """Lightweight truck representation for list screens and dropdowns."""
+    id: PyObjectId = Field(alias="_id")
+    truck_number: str
+    truck_photo_url: Optional[str] = None
+    nearest_expiry: Optional[date] = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def compute_nearest_expiry(cls, data):
+        if isinstance(data, dict) and "documents" in data:
+            expiries = [
+                (data["documents"].get(doc) or {}).get(key)
+                for doc, key in TRUCK_DOC_EXPIRY_FIELDS.items()
+            ]
+            expiries = [e.date() if isinstance(e, datetime) else e for e in expiries if e]
+            data = {k: v for k, v in data.items() if k != "documents"}
+            data["nearest_expiry"] = min(expiries) if expiries else None
+        return data
+
+    class Config:
+        json_encoders = {ObjectId: str}
+        populate_by_name = True
@@ -1,14 +1,20 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Header
-from typing import List
+from fastapi import APIRouter, HTTPException, status, Depends, Header, Query
+from typing import List, Optional, Union
 from datetime import datetime, timedelta
 from bson import ObjectId
 from app.database.database import db
 from app.models.company import CompanyOut, SetCredentialsRequest
+from app.models.pagination import Page
 from app.utils.jwt_utils import extract_token_from_header
 from app.utils.jwt_utils import verify_access_token
 from app.utils.email_utils import send_email
 from app.utils.reset_utils import generate_reset_token
-import bcrypt
+from app.utils.pagination_utils import paginate_find, DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
+from app.utils.stream_utils import stream_documents, ensure_streamable, STREAM_BATCH_SIZE, STREAM_FORMATS
+from app.utils.serialization_utils import dumps
+from app.utils.metrics_utils import collect_metrics
+from app.utils.password_utils import hash_password_sync, verify_password_sync
+from app.utils.identity_utils import sync_identities, remove_identities
 import uuid
 
 router = APIRouter()
@@ -82,38 +88,7 @@ def dashboard_stats(admin: dict = Depends(get_admin_payload)):
         "recent_requests": recent
     }
 
-@router.get("/companies", response_model=List[CompanyOut], tags=["Admin"])
-def list_companies(status: str = None, admin: dict = Depends(get_admin_payload)):
-    query = {}
-    if status:
-        query["status"] = status
-    docs = db.companies.find(query)
-    out = []
-    for c in docs:
-        c_out = CompanyOut(
-            id=str(c["_id"]),
-            company_name=c["company_name"],
-            owner_name=c["owner_name"],
-            email=c["email"],
-            primary_phone=c["primary_phone"],
-            secondary_phones=c.get("secondary_phones", []),
-            address=c.get("address"),
-            logo_url=c.get("logo_url"),
-            status=c.get("status"),
-            submitted_at=c.get("submitted_at"),
-            payment_due_at=c.get("payment_due_at"),
-            payment_reminder_sent=c.get("payment_reminder_sent", False),
-            must_change_password=c.get("must_change_password", False),
-            username=c.get("username")
-        )
-        out.append(c_out)
-    return out
-
-@router.get("/company/{company_id}", response_model=CompanyOut, tags=["Admin"])
-def get_company(company_id: str, admin: dict = Depends(get_admin_payload)):
-    c = db.companies.find_one({"_id": ObjectId(company_id)})
-    if not c:
-        raise HTTPException(status_code=404, detail="Company not found")
+def company_out(c: dict) -> CompanyOut:
     return CompanyOut(
         id=str(c["_id"]),
         company_name=c["company_name"],
@@ -131,6 +106,42 @@ def get_company(company_id: str, admin: dict = Depends(get_admin_payload)):
         username=c.get("username")
     )
 
+@router.get("/companies", response_model=Union[List[CompanyOut], Page[CompanyOut]], tags=["Admin"])
+def list_companies(
+    status: str = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+    stream: Optional[str] = Query(None, enum=STREAM_FORMATS, description="Stream the full list as NDJSON or a chunked JSON array."),
+    admin: dict = Depends(get_admin_payload)
+):
+    ensure_streamable(stream, limit, cursor)
+    query = {}
+    if status:
+        query["status"] = status
+    if stream:
+        companies_cursor = db.companies.find(query).batch_size(STREAM_BATCH_SIZE)
+        return stream_documents(
+            companies_cursor,
+            lambda c: company_out(c).model_dump_json().encode("utf-8"),
+            stream
+        )
+    next_cursor = None
+    if limit is None and cursor is None:
+        docs = db.companies.find(query)
+    else:
+        docs, next_cursor = paginate_find(db.companies, query, "_id", limit or DEFAULT_PAGE_LIMIT, cursor)
+    out = [company_out(c) for c in docs]
+    if limit is None and cursor is None:
+        return out
+    return Page[CompanyOut](items=out, next_cursor=next_cursor)
+
+@router.get("/company/{company_id}", response_model=CompanyOut, tags=["Admin"])
+def get_company(company_id: str, admin: dict = Depends(get_admin_payload)):
+    c = db.companies.find_one({"_id": ObjectId(company_id)})
+    if not c:
+        raise HTTPException(status_code=404, detail="Company not found")
+    return company_out(c)
+
 @router.post("/company/{company_id}/review", tags=["Admin"])
 def review_company(company_id: str, admin: dict = Depends(get_admin_payload)):
     result = db.companies.update_one(
@@ -146,6 +157,7 @@ def delete_company(company_id: str, admin: dict = Depends(get_admin_payload)):
     result = db.companies.delete_one({"_id": ObjectId(company_id)})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Company not found")
+    remove_identities("company", ObjectId(company_id))
     return {"message": "Company rejected and deleted"}
 
 @router.post("/company/{company_id}/send-payment", tags=["Admin"])
@@ -256,7 +268,7 @@ def set_credentials(company_id: str, payload: SetCredentialsRequest, admin: dict
     else:
         password_plain = uuid.uuid4().hex[:7]  
 
-    hashed = bcrypt.hashpw(password_plain.encode(), bcrypt.gensalt()).decode()
+    hashed = hash_password_sync(password_plain)
 
     db.companies.update_one(
         {"_id": ObjectId(company_id)},
@@ -267,6 +279,7 @@ def set_credentials(company_id: str, payload: SetCredentialsRequest, admin: dict
             "must_change_password": True
         }}
     )
+    sync_identities("company", {**c, "username": username})
 
     subject = "Your FleetDocs Login Credentials"
     body = f"""
@@ -295,20 +308,48 @@ def change_admin_password(old_password: str, new_password: str, admin: dict = De
     if not doc:
         raise HTTPException(status_code=404, detail="Admin not found")
 
-    if not bcrypt.checkpw(old_password.encode(), doc["password"].encode()):
+    if not verify_password_sync(old_password, doc["password"]):
         raise HTTPException(status_code=400, detail="Old password incorrect")
 
-    hashed = bcrypt.hashpw(new_password.encode(), bcrypt.gensalt()).decode()
+    hashed = hash_password_sync(new_password)
     db.admins.update_one({"username": admin_username}, {"$set": {"password": hashed}})
     return {"message": "Password changed successfully"}
 
+def contact_request_json(req: dict) -> bytes:
+    req["id"] = str(req.pop("_id"))
+    return dumps(req)
+
+@router.get("/metrics", tags=["Admin"])
+def get_metrics(admin: dict = Depends(get_admin_payload)):
+    """
+    Returns in-process counters (cache hit rates, queue depths, job timings) for this worker.
+    """
+    return collect_metrics()
+
 @router.get("/contact-requests", tags=["Admin"])
-def list_contact_requests(status: str = "pending_submission", admin: dict = Depends(get_admin_payload)):
+def list_contact_requests(
+    status: str = "pending_submission",
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+    stream: Optional[str] = Query(None, enum=STREAM_FORMATS, description="Stream the full list as NDJSON or a chunked JSON array."),
+    admin: dict = Depends(get_admin_payload)
+):
     """
     Fetches a list of contact requests by status, primarily for 'pending_submission'.
+    Passing `limit`/`cursor` returns a page, newest first, along with `next_cursor`.
     """
+    ensure_streamable(stream, limit, cursor)
     query = {"status": status}
-    requests_cursor = db.contact_requests.find(query)
+    if stream:
+        requests_cursor = db.contact_requests.find(query).batch_size(STREAM_BATCH_SIZE)
+        return stream_documents(requests_cursor, contact_request_json, stream)
+    next_cursor = None
+    if limit is None and cursor is None:
+        requests_cursor = db.contact_requests.find(query)
+    else:
+        requests_cursor, next_cursor = paginate_find(
+            db.contact_requests, query, "submitted_at", limit or DEFAULT_PAGE_LIMIT, cursor, direction=-1
+        )
     
     result = []
     for req in requests_cursor:
@@ -316,7 +357,9 @@ def list_contact_requests(status: str = "pending_submission", admin: dict = Depe
         del req["_id"]
         result.append(req)
         
-    return result
+    if limit is None and cursor is None:
+        return result
+    return {"items": result, "next_cursor": next_cursor}
 
 @router.post("/approve-request/{request_id}", tags=["Admin"])
 def approve_contact_request(request_id: str, admin: dict = Depends(get_admin_payload)):
@@ -334,6 +377,7 @@ def approve_contact_request(request_id: str, admin: dict = Depends(get_admin_pay
     result = db.companies.insert_one(company_data)
 
     if result.inserted_id:
+        sync_identities("company", company_data)
         db.contact_requests.delete_one({"_id": ObjectId(request_id)})
         return {"message": "Request approved. Company created and moved to 'Under Review'.", "new_company_id": str(result.inserted_id)}
     else:
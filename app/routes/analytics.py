@@ -0,0 +1,86 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from bson import ObjectId
+from app.database.database import db
+from app.models.analytics import UtilizationReport, UtilizationPeriod
+from app.routes.company import get_current_company
+
+router = APIRouter()
+
+MAX_REPORT_DAYS = 366
+
+def period_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+@router.get("/utilization", response_model=UtilizationReport)
+def get_utilization(
+    from_date: date = Query(..., alias="from"),
+    to_date: date = Query(..., alias="to"),
+    granularity: str = Query("day", enum=["day", "week", "month"]),
+    kind: str = Query("truck", enum=["truck", "driver"]),
+    company: dict = Depends(get_current_company)
+):
+    """
+    Reports per-truck or per-driver utilization between `from` and `to` (inclusive),
+    grouped by day, week or month. Reads only the pre-aggregated daily buckets kept up
+    to date by the rollup job, never the raw assignments.
+    """
+    if to_date < from_date:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'.")
+    if (to_date - from_date).days >= MAX_REPORT_DAYS:
+        raise HTTPException(status_code=400, detail=f"The report range is limited to {MAX_REPORT_DAYS} days.")
+
+    company_id = ObjectId(company["company_id"])
+    buckets = db.utilization_daily.find(
+        {
+            "company_id": company_id,
+            "kind": kind,
+            "day": {
+                "$gte": datetime.combine(from_date, datetime.min.time()),
+                "$lt": datetime.combine(to_date + timedelta(days=1), datetime.min.time())
+            }
+        },
+        {"_id": 0, "day": 1, "resource_id": 1, "active_hours": 1, "trips": 1, "load_types": 1, "routes": 1}
+    )
+
+    # Hours available in each period, clipped to the requested range.
+    period_hours = defaultdict(float)
+    day = from_date
+    while day <= to_date:
+        period_hours[period_start(day, granularity)] += 24
+        day += timedelta(days=1)
+
+    totals = {}
+    for bucket in buckets:
+        key = (period_start(bucket["day"].date(), granularity), bucket["resource_id"])
+        total = totals.setdefault(key, {
+            "active_hours": 0.0, "trips": 0,
+            "load_types": defaultdict(int), "routes": defaultdict(int)
+        })
+        total["active_hours"] += bucket["active_hours"]
+        total["trips"] += bucket["trips"]
+        for load in bucket.get("load_types", []):
+            total["load_types"][load["type"]] += load["count"]
+        for route in bucket.get("routes", []):
+            total["routes"][(route["origin"], route["destination"])] += route["count"]
+
+    items = []
+    for (start, resource_id), total in sorted(totals.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+        items.append(UtilizationPeriod(
+            period_start=start,
+            resource_id=str(resource_id),
+            active_hours=round(total["active_hours"], 2),
+            trips=total["trips"],
+            utilization=round(min(total["active_hours"] / period_hours[start], 1.0), 4),
+            load_types=[{"type": t, "count": n} for t, n in sorted(total["load_types"].items())],
+            routes=[
+                {"origin": o, "destination": d, "count": n}
+                for (o, d), n in sorted(total["routes"].items(), key=lambda item: -item[1])
+            ]
+        ))
+    return UtilizationReport(from_date=from_date, to_date=to_date, granularity=granularity, kind=kind, items=items)
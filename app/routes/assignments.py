@@ -1,65 +1,327 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List
-from app.database.database import db
-from app.models.assignment import AssignmentCreate, AssignmentOut
-from app.models.truck import TruckOut
-from app.models.driver import DriverOut
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Tuple, Union
+from app.database.database import db, active_unique_enforced
+from app.models.assignment import (
+    AssignmentCreate, AssignmentOut, AssignmentSummary,
+    AssignmentBulkCreate, AssignmentBulkItemResult, AssignmentBulkResult
+)
+from app.models.pagination import Page
+from app.models.truck import TruckOut, TRUCK_SUMMARY_PROJECTION
+from app.models.driver import DriverOut, DRIVER_SUMMARY_PROJECTION
 from app.routes.company import get_current_company
+from app.utils.pagination_utils import keyset_filter, merge_filters, sort_spec, split_page, DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
+from app.utils.projection_utils import resolve_fieldset, fieldset_response, model_projection
+from app.utils.stream_utils import stream_documents, ensure_streamable, model_encoder, STREAM_BATCH_SIZE, STREAM_FORMATS
+from app.utils.serialization_utils import trusted_response, trusted_page_response, model_json_encoder, document_shaper, dumps
+from app.utils.version_utils import bump_version, check_etag, with_etag
+from app.utils.availability_utils import available_filter, is_available, mark_assigned, release_assignments
+from app.utils.assignment_status_utils import status_filter, effective_fields, status_epoch, archive_lapsed_for
+from app.utils.history_utils import history_partitions, move_to_history, union_stages
+from app.utils.archive_utils import load_manifests, iter_archive, MEDIA_TYPES
 from bson import ObjectId
+from pymongo import InsertOne, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from datetime import datetime
 
 router = APIRouter()
 
+ASSIGNMENT_VIEWS = {
+    "summary": (
+        {
+            "id": 1, "status": 1, "assignment_date": 1, "completed_at": 1, "origin": 1, "destination": 1,
+            "truck": TRUCK_SUMMARY_PROJECTION, "driver": DRIVER_SUMMARY_PROJECTION
+        },
+        AssignmentSummary
+    )
+}
+
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=AssignmentOut)
 async def create_assignment(payload: AssignmentCreate, company: dict = Depends(get_current_company)):
+    """
+    Creates an active assignment. Double-booking is rejected by the partial unique
+    indexes on active truck_id/driver_id, so concurrent requests cannot both succeed;
+    the response is built from the truck and driver loaded for the ownership check.
+    A truck or driver whose previous assignment has lapsed is compacted on the spot.
+    """
     company_id = ObjectId(company["company_id"])
-    active_assignment = db.assignments.find_one({
-        "company_id": company_id,
-        "status": "active",
-        "$or": [
-            {"truck_id": ObjectId(payload.truck_id)},
-            {"driver_id": ObjectId(payload.driver_id)}
-        ]
-    })
-    if active_assignment:
+    truck, driver = load_truck_and_driver(company_id, payload.truck_id, payload.driver_id)
+
+    now = datetime.utcnow()
+    assignment_data = payload.dict()
+    assignment_data["company_id"] = company_id
+    # BSON dates have millisecond precision; truncate so the echoed record matches later reads.
+    assignment_data["assignment_date"] = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    assignment_data["updated_at"] = assignment_data["assignment_date"]
+    assignment_data["status"] = "active"
+    if not (is_available(truck) and is_available(driver)):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The selected truck or driver is already on an active assignment."
+        )
+    if truck.get("active_assignment_id") or driver.get("active_assignment_id"):
+        # Their previous assignment has lapsed but is not compacted yet; free them first.
+        archive_lapsed_for(company_id, [truck["_id"]], [driver["_id"]])
+    if not active_unique_enforced():
+        busy_trucks, busy_drivers = active_conflicts(company_id, [truck["_id"]], [driver["_id"]])
+        if busy_trucks or busy_drivers:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="The selected truck or driver is already on an active assignment."
+            )
+    try:
+        result = db.assignments.insert_one(assignment_data)
+    except DuplicateKeyError:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="The selected truck or driver is already on an active assignment."
         )
+    mark_assigned(company_id, [assignment_data])
+    bump_version(company_id, "assignments")
 
-    assignment_data = payload.dict(by_alias=True)
-    assignment_data["company_id"] = company_id
-    assignment_data["assignment_date"] = datetime.utcnow()
-    assignment_data["status"] = "active"
-    result = db.assignments.insert_one(assignment_data)
-    new_assignment = get_assignments_with_details(company_id, {"_id": result.inserted_id})
-    if not new_assignment:
-        raise HTTPException(status_code=500, detail="Failed to retrieve created assignment.")
-        
-    return new_assignment[0]
+    assignment_data["id"] = str(result.inserted_id)
+    assignment_data["truck"] = truck
+    assignment_data["driver"] = driver
+    return trusted_response(AssignmentOut, assignment_data, status_code=status.HTTP_201_CREATED)
+
+
+@router.post("/bulk", response_model=AssignmentBulkResult)
+async def create_assignments_bulk(payload: AssignmentBulkCreate, company: dict = Depends(get_current_company)):
+    """
+    Creates many assignments in one request. Every entry is checked against a single
+    snapshot of the company's trucks and drivers and against earlier entries of the same
+    batch; the valid ones are inserted with one unordered bulk_write. Entries that lose
+    a race with another dispatcher are caught by the unique indexes and reported as
+    conflicts. Results are returned in request order.
+    """
+    company_id = ObjectId(company["company_id"])
+    items = payload.assignments
+    trucks = {t["_id"]: t for t in db.trucks.find(
+        {"_id": {"$in": list({i.truck_id for i in items})}, "company_id": company_id},
+        {"active_assignment_id": 1, "assigned_until": 1}
+    )}
+    drivers = {d["_id"]: d for d in db.drivers.find(
+        {"_id": {"$in": list({i.driver_id for i in items})}, "company_id": company_id},
+        {"active_assignment_id": 1, "assigned_until": 1}
+    )}
+
+    results: List[Optional[AssignmentBulkItemResult]] = [None] * len(items)
+    claimed_trucks, claimed_drivers = set(), set()
+    pending = []
+    now = datetime.utcnow()
+    assignment_date = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    for index, item in enumerate(items):
+        truck, driver = trucks.get(item.truck_id), drivers.get(item.driver_id)
+        if truck is None or driver is None:
+            detail = "Truck not found." if truck is None else "Driver not found."
+            results[index] = AssignmentBulkItemResult(index=index, status="not_found", detail=detail)
+            continue
+        if not (is_available(truck, now) and is_available(driver, now)):
+            results[index] = AssignmentBulkItemResult(
+                index=index, status="conflict",
+                detail="The selected truck or driver is already on an active assignment."
+            )
+            continue
+        if item.truck_id in claimed_trucks or item.driver_id in claimed_drivers:
+            results[index] = AssignmentBulkItemResult(
+                index=index, status="conflict",
+                detail="The selected truck or driver is used by an earlier entry in this batch."
+            )
+            continue
+        claimed_trucks.add(item.truck_id)
+        claimed_drivers.add(item.driver_id)
+        assignment_data = item.dict()
+        assignment_data.update({
+            "_id": ObjectId(), "company_id": company_id,
+            "assignment_date": assignment_date, "updated_at": assignment_date, "status": "active"
+        })
+        pending.append((index, assignment_data))
+
+    lapsed_trucks = {doc["truck_id"] for _, doc in pending if trucks[doc["truck_id"]].get("active_assignment_id")}
+    lapsed_drivers = {doc["driver_id"] for _, doc in pending if drivers[doc["driver_id"]].get("active_assignment_id")}
+    if lapsed_trucks or lapsed_drivers:
+        archive_lapsed_for(company_id, lapsed_trucks, lapsed_drivers)
+    if pending and not active_unique_enforced():
+        busy_trucks, busy_drivers = active_conflicts(
+            company_id, [doc["truck_id"] for _, doc in pending], [doc["driver_id"] for _, doc in pending]
+        )
+        for index, doc in pending:
+            if doc["truck_id"] in busy_trucks or doc["driver_id"] in busy_drivers:
+                results[index] = AssignmentBulkItemResult(
+                    index=index, status="conflict",
+                    detail="The selected truck or driver is already on an active assignment."
+                )
+        pending = [(index, doc) for index, doc in pending if results[index] is None]
+
+    failed_ops = set()
+    if pending:
+        try:
+            db.assignments.bulk_write([InsertOne(doc) for _, doc in pending], ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                if error.get("code") != 11000:
+                    raise
+                failed_ops.add(error["index"])
+
+    inserted = []
+    for op_index, (index, doc) in enumerate(pending):
+        if op_index in failed_ops:
+            results[index] = AssignmentBulkItemResult(
+                index=index, status="conflict",
+                detail="The selected truck or driver is already on an active assignment."
+            )
+        else:
+            inserted.append(doc)
+            results[index] = AssignmentBulkItemResult(index=index, status="created", id=str(doc["_id"]))
+
+    if inserted:
+        mark_assigned(company_id, inserted)
+        bump_version(company_id, "assignments")
+    return AssignmentBulkResult(created=len(inserted), failed=len(items) - len(inserted), results=results)
+
+
+def active_conflicts(company_id: ObjectId, truck_ids: List[ObjectId], driver_ids: List[ObjectId]) -> Tuple[set, set]:
+    """
+    The given trucks and drivers that already have an active assignment. Only used while
+    the active-unique indexes are missing (see ensure_indexes); unlike the indexes, this
+    check cannot stop two concurrent requests from both passing it.
+    """
+    busy = db.assignments.find(
+        {
+            "company_id": company_id,
+            "status": "active",
+            "$or": [{"truck_id": {"$in": truck_ids}}, {"driver_id": {"$in": driver_ids}}]
+        },
+        {"truck_id": 1, "driver_id": 1}
+    )
+    busy_trucks, busy_drivers = set(), set()
+    for assignment in busy:
+        busy_trucks.add(assignment.get("truck_id"))
+        busy_drivers.add(assignment.get("driver_id"))
+    return busy_trucks & set(truck_ids), busy_drivers & set(driver_ids)
+
+
+def load_truck_and_driver(company_id: ObjectId, truck_id: ObjectId, driver_id: ObjectId) -> Tuple[dict, dict]:
+    """
+    Fetches the company's truck and driver in a single round trip ($unionWith) and
+    raises 404 if either does not exist or belongs to another company.
+    """
+    pipeline = [
+        {"$match": {"_id": truck_id, "company_id": company_id}},
+        {"$addFields": {"_kind": "truck"}},
+        {"$unionWith": {
+            "coll": "drivers",
+            "pipeline": [
+                {"$match": {"_id": driver_id, "company_id": company_id}},
+                {"$addFields": {"_kind": "driver"}}
+            ]
+        }}
+    ]
+    found = {doc.pop("_kind"): doc for doc in db.trucks.aggregate(pipeline)}
+    if "truck" not in found:
+        raise HTTPException(status_code=404, detail="Truck not found.")
+    if "driver" not in found:
+        raise HTTPException(status_code=404, detail="Driver not found.")
+    return found["truck"], found["driver"]
 
 
-@router.get("/", response_model=List[AssignmentOut])
+@router.get("/", response_model=Union[List[AssignmentOut], Page[AssignmentOut]])
 async def get_assignments(
+    request: Request,
     status: str = Query("active", enum=["active", "history"]), 
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated AssignmentOut fields to return."),
+    view: Optional[str] = Query(None, enum=list(ASSIGNMENT_VIEWS)),
+    stream: Optional[str] = Query(None, enum=STREAM_FORMATS, description="Stream the full list as NDJSON or a chunked JSON array."),
+    company: dict = Depends(get_current_company)
+):
+    """
+    Lists assignments by status. Without `limit`/`cursor` the full list is returned;
+    with either, a page ordered newest first is returned along with `next_cursor`.
+    `fields` or `view` restrict the joined truck/driver data and the response shape.
+    `stream` sends the full list in batches straight from the aggregation cursor.
+    History spans the not-yet-moved records in `assignments` and every monthly partition.
+    """
+    company_id = ObjectId(company["company_id"])
+    # Assignments lapse into history with time alone, which the data versions do not see.
+    etag = check_etag(request, company_id, ("assignments", "trucks", "drivers"), variant=status_epoch(company_id))
+    match_filter = status_filter(status)
+    partitions = history_partitions() if status == "history" else []
+    ensure_streamable(stream, limit, cursor)
+    paged = limit is not None or cursor is not None
+    fieldset = resolve_fieldset(AssignmentOut, fields, view, ASSIGNMENT_VIEWS)
+
+    if stream:
+        projection, out_model = fieldset or (None, AssignmentOut)
+        pipeline = build_assignments_pipeline(company_id, match_filter, projection, partitions=partitions)
+        results = db.assignments.aggregate(pipeline, batchSize=STREAM_BATCH_SIZE)
+        encoder = model_encoder(out_model) if fieldset else model_json_encoder(AssignmentOut)
+        return with_etag(stream_documents(results, encoder, stream), etag)
+
+    projection, out_model = fieldset or (None, AssignmentOut)
+    next_cursor = None
+    if not paged:
+        results = aggregate_assignments(company_id, match_filter, projection, partitions)
+    else:
+        results, next_cursor = get_assignments_page(
+            company_id, match_filter, limit or DEFAULT_PAGE_LIMIT, cursor, projection, partitions
+        )
+
+    if fieldset:
+        return with_etag(fieldset_response([out_model.model_validate(r) for r in results], next_cursor, paged), etag)
+    if not paged:
+        return with_etag(trusted_response(AssignmentOut, results), etag)
+    return with_etag(trusted_page_response(AssignmentOut, results, next_cursor), etag)
+
+
+@router.get("/archive")
+def get_assignment_archive(
+    month: str = Query(..., pattern=r"^\d{4}-(0[1-9]|1[0-2])$", description="Archived month as YYYY-MM."),
     company: dict = Depends(get_current_company)
 ):
+    """
+    Downloads a month of history that has passed retention and been moved to cold
+    storage, as compressed JSONL (one assignment per line). A month archived in several
+    parts is sent as one file. The file is streamed from storage in chunks and is never
+    held in memory.
+    """
     company_id = ObjectId(company["company_id"])
-    return get_assignments_with_details(company_id, {"status": status})
+    manifests = load_manifests(company_id, month)
+    if not manifests:
+        raise HTTPException(status_code=404, detail="No archived history for this month.")
+    filename = manifests[0]["key"].rsplit("/", 1)[-1]
+    headers = {
+        "Content-Disposition": f'attachment; filename="assignments-{filename}"',
+        "Content-Length": str(sum(m["bytes"] for m in manifests)),
+        "X-Record-Count": str(sum(m["records"] for m in manifests))
+    }
+    if len(manifests) == 1:
+        headers["X-Content-SHA256"] = manifests[0]["sha256"]
+    return StreamingResponse(
+        iter_archive([m["key"] for m in manifests]),
+        media_type=MEDIA_TYPES[manifests[0]["compression"]],
+        headers=headers
+    )
 
 
 @router.post("/{assignment_id}/complete", status_code=status.HTTP_200_OK)
 async def complete_assignment(assignment_id: str, company: dict = Depends(get_current_company)):
     company_id = ObjectId(company["company_id"])
     assignment_id_obj = ObjectId(assignment_id)
+    now = datetime.utcnow()
 
-    result = db.assignments.update_one(
-        {"_id": assignment_id_obj, "company_id": company_id, "status": "active"},
-        {"$set": {"status": "history", "completed_at": datetime.utcnow()}}
+    completed = db.assignments.find_one_and_update(
+        {"_id": assignment_id_obj, "company_id": company_id, **status_filter("active")},
+        {"$set": {"status": "history", "completed_at": now, "updated_at": now}},
+        return_document=ReturnDocument.AFTER
     )
 
-    if result.matched_count == 0:
+    if completed is None:
         raise HTTPException(status_code=404, detail="Active assignment not found.")
+    release_assignments([completed])
+    move_to_history([completed])
+    bump_version(company_id, "assignments")
     
     return {"message": "Assignment marked as complete and moved to history."}
 
@@ -71,52 +333,115 @@ async def get_unassigned_resources(company: dict = Depends(get_current_company))
     making it easy for the frontend to populate dropdowns.
     """
     company_id = ObjectId(company["company_id"])
-    active_assignments = db.assignments.find({"company_id": company_id, "status": "active"})
-    assigned_truck_ids = {a["truck_id"] for a in active_assignments}
-    active_assignments.rewind()
-    assigned_driver_ids = {a["driver_id"] for a in active_assignments}
-    unassigned_trucks = db.trucks.find({"company_id": company_id, "_id": {"$nin": list(assigned_truck_ids)}})
-    unassigned_drivers = db.drivers.find({"company_id": company_id, "_id": {"$nin": list(assigned_driver_ids)}})
+    available = {"company_id": company_id, **available_filter()}
+    unassigned_trucks = db.trucks.find(available, model_projection(TruckOut))
+    unassigned_drivers = db.drivers.find(available, model_projection(DriverOut))
     
-    return {
-        "trucks": [TruckOut(**t) for t in unassigned_trucks],
-        "drivers": [DriverOut(**d) for d in unassigned_drivers]
-    }
+    shape_truck, shape_driver = document_shaper(TruckOut), document_shaper(DriverOut)
+    return Response(
+        content=dumps({
+            "trucks": [shape_truck(t) for t in unassigned_trucks],
+            "drivers": [shape_driver(d) for d in unassigned_drivers]
+        }),
+        media_type="application/json"
+    )
 
 
-def get_assignments_with_details(company_id: ObjectId, match_filter: dict) -> List[AssignmentOut]:
+def get_assignments_page(
+    company_id: ObjectId,
+    match_filter: dict,
+    limit: int,
+    cursor: Optional[str] = None,
+    projection: Optional[dict] = None,
+    partitions: Optional[List[str]] = None
+) -> Tuple[List[dict], Optional[str]]:
     """
-    Helper function to query assignments and populate truck/driver details
-    using MongoDB's aggregation framework.
+    Keyset-paginated variant of aggregate_assignments, newest assignments first.
+    The cursor filter, sort and limit run before the $lookup stages so only one page
+    of trucks and drivers is ever joined. Rows whose truck or driver no longer exists
+    are kept through the joins so the cursor is taken from the full page, and are only
+    dropped afterwards (a page may then hold fewer than `limit` assignments).
     """
+    cursor_filter = keyset_filter("assignment_date", cursor, -1)
+    projection = projection or {name: 1 for name in AssignmentOut.model_fields}
+    pipeline = build_assignments_pipeline(
+        company_id, merge_filters(match_filter, cursor_filter), projection,
+        page_stages=[{"$sort": dict(sort_spec("assignment_date", -1))}, {"$limit": limit + 1}],
+        partitions=partitions,
+        partition_filter=cursor_filter,
+        keep_unmatched=True
+    )
+    page, next_cursor = split_page(list(db.assignments.aggregate(pipeline)), "assignment_date", limit)
+    joined = [field for field in ("truck", "driver") if field in projection]
+    return [row for row in page if all(field in row for field in joined)], next_cursor
+
+
+def build_assignments_pipeline(
+    company_id: ObjectId,
+    match_filter: dict,
+    projection: Optional[dict] = None,
+    page_stages: Optional[List[dict]] = None,
+    partitions: Optional[List[str]] = None,
+    partition_filter: Optional[dict] = None,
+    keep_unmatched: bool = False
+) -> List[dict]:
+    """
+    Builds the aggregation that joins assignments with their truck and driver.
+    `projection` maps output fields to 1, or for `truck`/`driver` optionally to a
+    projection applied inside the $lookup; joins for fields that are not requested
+    are skipped entirely. History `partitions` are unioned in before the joins, each
+    filtered by `partition_filter` and cut to a page on its own before the final cut.
+    Assignments whose truck or driver is gone are dropped, or with `keep_unmatched`
+    returned without that field.
+    """
+    projection = projection or {name: 1 for name in AssignmentOut.model_fields}
     pipeline = [
         {"$match": {"company_id": company_id, **match_filter}},
-        {"$lookup": {
-            "from": "trucks",
-            "localField": "truck_id",
-            "foreignField": "_id",
-            "as": "truckDetails"
-        }},
-        {"$lookup": {
-            "from": "drivers",
-            "localField": "driver_id",
-            "foreignField": "_id",
-            "as": "driverDetails"
-        }},
-        {"$unwind": "$truckDetails"},
-        {"$unwind": "$driverDetails"},
-        {"$project": {
-            "id": {"$toString": "$_id"},
-            "truck": "$truckDetails",
-            "driver": "$driverDetails",
-            "status": "$status",
-            "assignment_date": "$assignment_date",
-            "completed_at": "$completed_at",
-            "type_of_load": "$type_of_load",
-            "origin": "$origin",
-            "destination": "$destination"
-        }}
+        *(page_stages or [])
     ]
-    
-    results = list(db.assignments.aggregate(pipeline))
-    return [AssignmentOut.model_validate(r) for r in results]
+    if partitions:
+        pipeline.extend(union_stages(partitions, company_id, partition_filter, page_stages))
+        pipeline.extend(page_stages or [])
+    for field, collection, local_field in (("truck", "trucks", "truck_id"), ("driver", "drivers", "driver_id")):
+        if field not in projection:
+            continue
+        lookup = {
+            "from": collection,
+            "localField": local_field,
+            "foreignField": "_id",
+            "as": f"{field}Details"
+        }
+        if isinstance(projection[field], dict):
+            lookup["pipeline"] = [{"$project": projection[field]}]
+        pipeline.append({"$lookup": lookup})
+        pipeline.append({"$unwind": {"path": f"${field}Details", "preserveNullAndEmptyArrays": keep_unmatched}})
+
+    output = {
+        "id": {"$toString": "$_id"},
+        "truck": "$truckDetails",
+        "driver": "$driverDetails",
+        **effective_fields(),
+        "assignment_date": "$assignment_date",
+        "type_of_load": "$type_of_load",
+        "origin": "$origin",
+        "destination": "$destination"
+    }
+    pipeline.append({"$project": {
+        key: value for key, value in output.items()
+        if key == "id" or key == "assignment_date" or key in projection
+    }})
+    return pipeline
+
+
+def aggregate_assignments(
+    company_id: ObjectId,
+    match_filter: dict,
+    projection: Optional[dict] = None,
+    partitions: Optional[List[str]] = None
+) -> List[dict]:
+    """
+    Runs the assignment/truck/driver join and returns the raw documents.
+    """
+    pipeline = build_assignments_pipeline(company_id, match_filter, projection, partitions=partitions)
+    return list(db.assignments.aggregate(pipeline))
+
@@ -8,12 +8,13 @@ import jwt
 from app.models.login import LoginRequest, OTPVerifyRequest
 from app.database.database import db
 from app.utils.jwt_utils import create_access_token
-from app.utils.otp_utils import send_otp, verify_otp
+from app.utils.otp_utils import send_otp, verify_otp, SENT_STATUSES, ALREADY_SENT
 from app.models.reset_password import PasswordResetRequest, PasswordResetConfirm
 from app.utils.reset_utils import generate_reset_token, get_token_expiry
 from app.utils.email_utils import send_reset_email
 from datetime import datetime
-import bcrypt
+from app.utils.password_utils import hash_password, verify_and_upgrade
+from app.utils.identity_utils import resolve_principal
 from app.config import JWT_SECRET_KEY, JWT_ALGORITHM 
 
 router = APIRouter()
@@ -26,25 +27,27 @@ async def login(payload: LoginRequest):
     identifier = payload.identifier.strip()
     password = payload.password
 
-    admin = db.admins.find_one({"$or": [{"username": identifier}, {"email": identifier}]})
+    role, principal = resolve_principal(identifier)
+    admin = principal if role == "admin" else None
 
     if admin:
-        if not bcrypt.checkpw(password.encode('utf-8'), admin["password"].encode('utf-8')):
+        if not await verify_and_upgrade(db.admins, admin, password):
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid username/email or password")
         
         phone_full = admin["primary_phone"]
-        send_status = send_otp(phone_full if phone_full.startswith("+") else f"+91{phone_full}")
-        if send_status not in ("pending", "sent"):
+        send_status = await send_otp(phone_full if phone_full.startswith("+") else f"+91{phone_full}")
+        if send_status not in SENT_STATUSES:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Unable to send OTP")
         return {
-            "message": "OTP sent to admin phone",
+            "message": "OTP already sent to admin phone" if send_status == ALREADY_SENT else "OTP sent to admin phone",
+            "already_sent": send_status == ALREADY_SENT,
             "role": "admin",
             "identifier": identifier
         }
 
-    company = db.companies.find_one({"$or":[{"username": identifier}, {"email": identifier}]})
+    company = principal if role == "company" else None
     if company:
-        if not bcrypt.checkpw(password.encode('utf-8'), company["password"].encode('utf-8')):
+        if not await verify_and_upgrade(db.companies, company, password):
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid username/email or password")
 
         if company.get("status") != "active":
@@ -54,12 +57,13 @@ async def login(payload: LoginRequest):
             )
 
         phone_full = company["primary_phone"]
-        send_status = send_otp(phone_full if phone_full.startswith("+") else f"+91{phone_full}")
-        if send_status not in ("pending", "sent"):
+        send_status = await send_otp(phone_full if phone_full.startswith("+") else f"+91{phone_full}")
+        if send_status not in SENT_STATUSES:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Unable to send OTP to company phone")
 
         return {
-            "message": "OTP sent to company phone",
+            "message": "OTP already sent to company phone" if send_status == ALREADY_SENT else "OTP sent to company phone",
+            "already_sent": send_status == ALREADY_SENT,
             "role": "company",
             "identifier": identifier
         }
@@ -71,10 +75,11 @@ async def verify_login_otp(payload: OTPVerifyRequest):
     identifier = payload.identifier.strip()
     code = payload.otp_code
 
-    admin = db.admins.find_one({"$or":[{"username": identifier}, {"email": identifier}]})
+    role, principal = resolve_principal(identifier)
+    admin = principal if role == "admin" else None
     if admin:
         phone_full = admin["primary_phone"]
-        if verify_otp(phone_full if phone_full.startswith("+") else f"+91{phone_full}", code):
+        if await verify_otp(phone_full if phone_full.startswith("+") else f"+91{phone_full}", code):
             token_data = {
                 "sub": admin["username"],
                 "role": "admin",
@@ -90,10 +95,10 @@ async def verify_login_otp(payload: OTPVerifyRequest):
         else:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid OTP")
 
-    company = db.companies.find_one({"$or":[{"username": identifier}, {"email": identifier}]})
+    company = principal if role == "company" else None
     if company:
         phone_full = company["primary_phone"]
-        if verify_otp(phone_full if phone_full.startswith("+") else f"+91{phone_full}", code):
+        if await verify_otp(phone_full if phone_full.startswith("+") else f"+91{phone_full}", code):
             token_data = {
                 "sub": company["username"],
                 "role": "company",
@@ -117,7 +122,8 @@ async def verify_login_otp(payload: OTPVerifyRequest):
 async def request_password_reset(payload: PasswordResetRequest):
     identifier = payload.identifier.strip()
 
-    admin = db.admins.find_one({"$or": [{"email": identifier}, {"username": identifier}]})
+    role, principal = resolve_principal(identifier)
+    admin = principal if role == "admin" else None
     if admin:
         token = generate_reset_token()
         expiry = get_token_expiry()
@@ -130,7 +136,7 @@ async def request_password_reset(payload: PasswordResetRequest):
         send_reset_email(admin["email"], token, identifier, "admin")
         return {"message": "If your email or username exists, a reset link has been sent."}
 
-    company = db.companies.find_one({"$or": [{"email": identifier}, {"username": identifier}]})
+    company = principal if role == "company" else None
     if company:
         token = generate_reset_token()
         expiry = get_token_expiry()
@@ -155,12 +161,13 @@ async def reset_password(payload: PasswordResetConfirm):
     if len(new_password) < 6:
         raise HTTPException(status_code=400, detail="Password too short. Must be at least 6 characters.")
 
-    admin = db.admins.find_one({"$or": [{"email": identifier}, {"username": identifier}]})
+    role, principal = resolve_principal(identifier)
+    admin = principal if role == "admin" else None
     if admin:
         if admin.get("reset_token") != token or admin.get("reset_token_expiry") < datetime.utcnow():
             raise HTTPException(status_code=400, detail="Invalid or expired token")
 
-        hashed_pw = bcrypt.hashpw(new_password.encode(), bcrypt.gensalt()).decode()
+        hashed_pw = await hash_password(new_password)
 
         db.admins.update_one(
             {"_id": admin["_id"]},
@@ -171,12 +178,12 @@ async def reset_password(payload: PasswordResetConfirm):
         )
         return {"message": "Password reset successful"}
 
-    company = db.companies.find_one({"$or": [{"email": identifier}, {"username": identifier}]})
+    company = principal if role == "company" else None
     if company:
         if company.get("reset_token") != token or company.get("reset_token_expiry") < datetime.utcnow():
             raise HTTPException(status_code=400, detail="Invalid or expired token")
 
-        hashed_pw = bcrypt.hashpw(new_password.encode(), bcrypt.gensalt()).decode()
+        hashed_pw = await hash_password(new_password)
 
         db.companies.update_one(
             {"_id": company["_id"]},
@@ -1,18 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, Header, status, Response, Body, Request
 from app.database.database import db
-from app.utils.jwt_utils import verify_access_token, extract_token_from_header, create_refresh_token, verify_refresh_token, create_access_token
+from app.utils.jwt_utils import verify_access_token, extract_token_from_header, create_refresh_token, verify_refresh_token, create_access_token, decode_token
 from bson import ObjectId
 from pydantic import BaseModel, EmailStr, Field, constr, validator
 from typing import List, Optional
 from datetime import datetime, timedelta
 from fastapi.responses import JSONResponse
 from app.models.login import LoginRequest, OTPVerifyRequest
-from app.utils.otp_utils import send_otp, verify_otp
+from app.utils.otp_utils import send_otp, verify_otp, SENT_STATUSES, ALREADY_SENT
 from app.models.reset_password import PasswordResetRequest, PasswordResetConfirm
 from app.utils.email_utils import send_password_change_notification, send_profile_update_email, send_contact_confirmation_email, send_reset_email
 from app.utils.jwt_utils import JWT_SECRET_KEY, JWT_ALGORITHM
+from app.utils.version_utils import check_etag
+from app.utils.assignment_status_utils import status_filter, status_epoch
 from datetime import datetime
-import bcrypt
+from app.utils.password_utils import hash_password
+from app.utils.identity_utils import resolve_principal, sync_identities
 import jwt
 
 router = APIRouter()
@@ -27,7 +30,7 @@ async def get_current_company(authorization: str = Header(...)):
     
     token = authorization.split(" ")[1]
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+        payload = decode_token(token)
         if payload.get("role") != "company":
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized for this resource.")
         
@@ -99,7 +102,7 @@ async def get_current_company(authorization: str = Header(...)):
     
     token = authorization.split(" ")[1]
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+        payload = decode_token(token)
         if payload.get("role") != "company":
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized.")
         
@@ -139,17 +142,22 @@ class DashboardStats(BaseModel):
     running_assignments: List[RunningAssignment]
 
 @router.get("/dashboard", response_model=DashboardStats, tags=["Company"])
-async def get_dashboard_data(company: dict = Depends(get_current_company)):
+async def get_dashboard_data(request: Request, response: Response, company: dict = Depends(get_current_company)):
     """
     Fetches aggregated data for the company's dashboard.
     This single endpoint provides all necessary data for the main dashboard screen.
     """
     company_id = ObjectId(company["company_id"])
+    # The expiry count depends on today's date and the active count on which assignments
+    # have lapsed, so both are part of the tag alongside the data versions.
+    variant = f"{datetime.utcnow().date().isoformat()}|{status_epoch(company_id)}"
+    etag = check_etag(request, company_id, ("trucks", "drivers", "assignments"), variant=variant)
+    response.headers["ETag"] = etag
     total_trucks = db.trucks.count_documents({"company_id": company_id})
     total_drivers = db.drivers.count_documents({"company_id": company_id})
     active_assignments = db.assignments.count_documents({
         "company_id": company_id,
-        "status": "running"
+        **status_filter("active")
     })
     
     expiry_threshold_date = datetime.utcnow() + timedelta(days=7)
@@ -170,8 +178,8 @@ async def get_dashboard_data(company: dict = Depends(get_current_company)):
             
     running_assignments_cursor = db.assignments.find({
         "company_id": company_id,
-        "status": "running"
-    }).limit(10)
+        **status_filter("active")
+    }).sort("assignment_date", -1).limit(10)
 
     running_assignments_list = []
     for assignment in running_assignments_cursor:
@@ -202,10 +210,11 @@ async def verify_login_otp(payload: OTPVerifyRequest):
     identifier = payload.identifier.strip()
     code = payload.otp_code
 
-    admin = db.admins.find_one({"$or":[{"username": identifier}, {"email": identifier}]})
+    role, principal = resolve_principal(identifier)
+    admin = principal if role == "admin" else None
     if admin:
         phone_full = admin["phone"]
-        if verify_otp(phone_full if phone_full.startswith("+") else f"+91{phone_full}", code):
+        if await verify_otp(phone_full if phone_full.startswith("+") else f"+91{phone_full}", code):
             token_data = {
                 "sub": admin["username"],
                 "role": "admin",
@@ -220,10 +229,10 @@ async def verify_login_otp(payload: OTPVerifyRequest):
         else:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid OTP")
 
-    company = db.companies.find_one({"$or":[{"username": identifier}, {"email": identifier}]})
+    company = principal if role == "company" else None
     if company:
         phone_full = company["primary_phone"]
-        if verify_otp(phone_full if phone_full.startswith("+") else f"+91{phone_full}", code):
+        if await verify_otp(phone_full if phone_full.startswith("+") else f"+91{phone_full}", code):
             token_data = {
                 "sub": company["username"],
                 "role": "company",
@@ -248,7 +257,7 @@ async def force_change_password(payload: PasswordChangeRequest, company: dict =
     if not company_data.get("must_change_password"):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Password change not required.")
 
-    hashed_password = bcrypt.hashpw(payload.new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    hashed_password = await hash_password(payload.new_password)
 
     db.companies.update_one(
         {"_id": ObjectId(company["company_id"])},
@@ -279,9 +288,11 @@ async def request_profile_update(payload: ProfileUpdateRequest, company: dict =
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Primary phone number not found.")
 
     phone_full = f"+91{primary_phone}"
-    send_status = send_otp(phone_full)
-    if send_status not in ("pending", "sent"):
+    send_status = await send_otp(phone_full)
+    if send_status not in SENT_STATUSES:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not send OTP.")
+    if send_status == ALREADY_SENT:
+        return {"message": f"An OTP was already sent to your primary phone number ending in {primary_phone[-4:]}. Please use that code.", "already_sent": True}
 
     return {"message": f"An OTP has been sent to your primary phone number ending in {primary_phone[-4:]} to confirm the update."}
 
@@ -292,7 +303,7 @@ async def confirm_profile_update(payload: ProfileUpdateConfirmRequest, company:
     primary_phone = company_data.get("primary_phone")
     phone_full = f"+91{primary_phone}"
 
-    if not verify_otp(phone_full, payload.otp_code):
+    if not await verify_otp(phone_full, payload.otp_code):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid OTP provided.")
 
     update_data = payload.updated_data.dict(exclude_unset=True)
@@ -300,6 +311,8 @@ async def confirm_profile_update(payload: ProfileUpdateConfirmRequest, company:
 
     if result.matched_count == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Company not found.")
+    if "email" in update_data:
+        sync_identities("company", {**company_data, **update_data})
     
     final_details = {
         "Company Name": update_data.get("company_name"),
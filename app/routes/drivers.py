@@ -1,19 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Request
+from typing import List, Optional, Union
 import uuid
 import time
 from app.database.database import db
-from app.models.driver import DriverInDB, DriverOut, DriverUpdate, LicenseDetails
+from app.models.driver import DriverInDB, DriverOut, DriverUpdate, LicenseDetails, DriverSummary, DRIVER_SUMMARY_PROJECTION
+from app.models.pagination import Page
 from app.routes.company import get_current_company
 from app.utils.aws_utils import upload_file_to_s3, start_document_text_detection, get_document_text_detection_results
 from app.utils.parser_utils import get_parser_for_doc_type
-from app.utils.email_utils import send_driver_added_email, send_driver_updated_email
+from app.utils.email_utils import send_driver_added_email
+from app.utils.notification_utils import record_change
+from app.utils.pagination_utils import paginate_find, DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
+from app.utils.projection_utils import resolve_fieldset, fieldset_response
+from app.utils.stream_utils import stream_documents, ensure_streamable, model_encoder, STREAM_BATCH_SIZE, STREAM_FORMATS
+from app.utils.serialization_utils import trusted_response, trusted_page_response, model_json_encoder
+from app.utils.version_utils import bump_version, check_etag, with_etag, read_versions
+from app.utils.cache_utils import driver_cache
+from app.utils.expiry_utils import driver_expiries
+from pymongo import ReturnDocument
 from bson import ObjectId
 import logging
 
 router = APIRouter()
 logging.basicConfig(level=logging.INFO)
 
+DRIVER_VIEWS = {"summary": (DRIVER_SUMMARY_PROJECTION, DriverSummary)}
+
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=DriverOut)
 async def add_driver(
     first_name: str = Form(...),
@@ -68,7 +80,10 @@ async def add_driver(
         license=license_details
     )
     
-    result = db.drivers.insert_one(new_driver.dict(by_alias=True))
+    driver_doc = new_driver.dict(by_alias=True)
+    driver_doc["document_expiries"] = driver_expiries(driver_doc["license"])
+    result = db.drivers.insert_one(driver_doc)
+    bump_version(company_id_obj, "drivers")
     created_driver = db.drivers.find_one({"_id": result.inserted_id})
     
     try:
@@ -81,48 +96,95 @@ async def add_driver(
     except Exception as e:
         logging.error(f"Failed to send driver added email: {e}")
         
-    return DriverOut(**created_driver)
+    return trusted_response(DriverOut, created_driver, status_code=status.HTTP_201_CREATED)
 
-@router.get("/", response_model=List[DriverOut])
-async def get_all_drivers(company: dict = Depends(get_current_company)):
+@router.get("/", response_model=Union[List[DriverOut], Page[DriverOut]])
+async def get_all_drivers(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated DriverOut fields to return."),
+    view: Optional[str] = Query(None, enum=list(DRIVER_VIEWS)),
+    stream: Optional[str] = Query(None, enum=STREAM_FORMATS, description="Stream the full list as NDJSON or a chunked JSON array."),
+    company: dict = Depends(get_current_company)
+):
+    """
+    Lists the company's drivers. Without `limit`/`cursor` the full list is returned;
+    with either, a page ordered by creation time is returned along with `next_cursor`.
+    `fields` or `view` restrict both what is read from Mongo and what is returned.
+    `stream` sends the full list in batches straight from the cursor.
+    """
     company_id = ObjectId(company["company_id"])
-    drivers_cursor = db.drivers.find({"company_id": company_id})
-    return [DriverOut(**driver) for driver in drivers_cursor]
+    etag = check_etag(request, company_id, ("drivers",))
+    ensure_streamable(stream, limit, cursor)
+    paged = limit is not None or cursor is not None
+    fieldset = resolve_fieldset(DriverOut, fields, view, DRIVER_VIEWS, include=("created_at",) if paged else ())
+    projection, out_model = fieldset or (None, DriverOut)
+
+    if stream:
+        drivers_cursor = db.drivers.find({"company_id": company_id}, projection).batch_size(STREAM_BATCH_SIZE)
+        encoder = model_encoder(out_model) if fieldset else model_json_encoder(DriverOut)
+        return with_etag(stream_documents(drivers_cursor, encoder, stream), etag)
+
+    next_cursor = None
+    if not paged:
+        drivers = db.drivers.find({"company_id": company_id}, projection)
+    else:
+        drivers, next_cursor = paginate_find(
+            db.drivers, {"company_id": company_id}, "created_at", limit or DEFAULT_PAGE_LIMIT, cursor,
+            projection=projection
+        )
+    if fieldset:
+        return with_etag(fieldset_response([out_model(**driver) for driver in drivers], next_cursor, paged), etag)
+    if not paged:
+        return with_etag(trusted_response(DriverOut, drivers), etag)
+    return with_etag(trusted_page_response(DriverOut, drivers, next_cursor), etag)
 
 @router.get("/{driver_id}", response_model=DriverOut)
-async def get_driver(driver_id: str, company: dict = Depends(get_current_company)):
+async def get_driver(
+    request: Request,
+    driver_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated DriverOut fields to return."),
+    view: Optional[str] = Query(None, enum=list(DRIVER_VIEWS)),
+    company: dict = Depends(get_current_company)
+):
     company_id = ObjectId(company["company_id"])
-    driver = db.drivers.find_one({"_id": ObjectId(driver_id), "company_id": company_id})
+    versions = read_versions(company_id)
+    etag = check_etag(request, company_id, ("drivers",), versions=versions)
+    fieldset = resolve_fieldset(DriverOut, fields, view, DRIVER_VIEWS)
+    projection, out_model = fieldset or (None, DriverOut)
+    driver_query = {"_id": ObjectId(driver_id), "company_id": company_id}
+    if fieldset:
+        driver = driver_cache.get(company_id, driver_id, versions.get("drivers", 0)) or db.drivers.find_one(driver_query, projection)
+    else:
+        driver = driver_cache.get_or_load(company_id, driver_id, versions.get("drivers", 0), lambda: db.drivers.find_one(driver_query))
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found.")
-    return DriverOut(**driver)
+    if fieldset:
+        return with_etag(fieldset_response(out_model(**driver)), etag)
+    return with_etag(trusted_response(DriverOut, driver), etag)
 
 @router.put("/{driver_id}", response_model=DriverOut)
 async def update_driver_phone(driver_id: str, payload: DriverUpdate, company: dict = Depends(get_current_company)):
     company_id = ObjectId(company["company_id"])
     driver_id_obj = ObjectId(driver_id)
     
-    db.drivers.update_one(
+    updated_driver = db.drivers.find_one_and_update(
         {"_id": driver_id_obj, "company_id": company_id},
-        {"$set": {"phone_number": payload.phone_number}}
+        {"$set": {"phone_number": payload.phone_number}},
+        return_document=ReturnDocument.AFTER
     )
-    
-    updated_driver = db.drivers.find_one({"_id": driver_id_obj})
     if not updated_driver:
         raise HTTPException(status_code=404, detail="Driver not found after update.")
+    driver_cache.invalidate(company_id, driver_id)
+    bump_version(company_id, "drivers", "assignments")
         
     try:
-        company_details = company.get("company_data", {})
-        send_driver_updated_email(
-            to_email=company_details.get("email"),
-            company_name=company_details.get("company_name"),
-            driver=updated_driver,
-            update_type="Phone Number"
-        )
+        record_change(company, "driver", driver_id_obj, {"update_type": "Phone Number"})
     except Exception as e:
-        logging.error(f"Failed to send driver updated email: {e}")
+        logging.error(f"Failed to record driver update notification: {e}")
         
-    return DriverOut(**updated_driver)
+    return trusted_response(DriverOut, updated_driver)
     
 @router.put("/license/{driver_id}", response_model=DriverOut)
 async def update_driver_license(
@@ -154,30 +216,29 @@ async def update_driver_license(
     
     new_license_details = LicenseDetails(**extracted_data, s3_url=license_s3_url)
     
-    db.drivers.update_one(
-        {"_id": driver_id_obj},
-        {"$set": {"license": new_license_details.dict()}}
+    updated_driver = db.drivers.find_one_and_update(
+        {"_id": driver_id_obj, "company_id": company_id},
+        {"$set": {"license": new_license_details.dict(), "document_expiries": driver_expiries(new_license_details.dict())}},
+        return_document=ReturnDocument.AFTER
     )
-    
-    updated_driver = db.drivers.find_one({"_id": driver_id_obj})
+    if not updated_driver:
+        raise HTTPException(status_code=404, detail="Driver not found after update.")
+    driver_cache.invalidate(company_id, driver_id)
+    bump_version(company_id, "drivers", "assignments")
 
     try:
-        company_details = company.get("company_data", {})
-        send_driver_updated_email(
-            to_email=company_details.get("email"),
-            company_name=company_details.get("company_name"),
-            driver=updated_driver,
-            update_type="Driving License"
-        )
+        record_change(company, "driver", driver_id_obj, {"update_type": "Driving License"})
     except Exception as e:
-        logging.error(f"Failed to send driver updated email: {e}")
+        logging.error(f"Failed to record driver update notification: {e}")
         
-    return DriverOut(**updated_driver)
+    return trusted_response(DriverOut, updated_driver)
 
 @router.delete("/{driver_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_driver(driver_id: str, company: dict = Depends(get_current_company)):
     company_id = ObjectId(company["company_id"])
     result = db.drivers.delete_one({"_id": ObjectId(driver_id), "company_id": company_id})
+    driver_cache.invalidate(company_id, driver_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Driver not found or you do not have permission to delete it.")
+    bump_version(company_id, "drivers", "assignments")
     return
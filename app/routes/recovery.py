@@ -1,9 +1,10 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from pydantic import BaseModel, EmailStr
 from app.database.database import db
-from app.utils.otp_utils import send_otp, verify_otp
+from app.utils.otp_utils import send_otp, verify_otp, SENT_STATUSES, ALREADY_SENT
 from app.utils.email_utils import send_account_recovery_credentials
-import bcrypt
+from app.utils.password_utils import hash_password
+from app.utils.jwt_utils import token_cache
 import secrets
 import uuid
 
@@ -25,9 +26,11 @@ async def request_recovery_otp(payload: RecoveryRequest):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="If your company details are correct, an OTP will be sent.")
 
     phone_full = company["primary_phone"]
-    send_status = send_otp(phone_full if phone_full.startswith("+") else f"+91{phone_full}")
-    if send_status not in ("pending", "sent"):
+    send_status = await send_otp(phone_full if phone_full.startswith("+") else f"+91{phone_full}")
+    if send_status not in SENT_STATUSES:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not send OTP. Please try again later.")
+    if send_status == ALREADY_SENT:
+        return {"message": "An OTP was already sent to the registered primary phone number. Please use that code.", "already_sent": True}
 
     return {"message": "OTP has been sent to the registered primary phone number."}
 
@@ -38,11 +41,11 @@ async def verify_otp_and_reset(payload: RecoveryVerification):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Company not found.")
 
     phone_full = company["primary_phone"]
-    if not verify_otp(phone_full if phone_full.startswith("+") else f"+91{phone_full}", payload.otp_code):
+    if not await verify_otp(phone_full if phone_full.startswith("+") else f"+91{phone_full}", payload.otp_code):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid OTP provided.")
 
     new_password = secrets.token_urlsafe(8)
-    hashed_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    hashed_password = await hash_password(new_password)
     session_invalidator = str(uuid.uuid4())
 
     db.companies.update_one(
@@ -55,6 +58,7 @@ async def verify_otp_and_reset(payload: RecoveryVerification):
             }
         }
     )
+    token_cache.invalidate_subject(company.get("username"))
 
     send_account_recovery_credentials(
         to_email=company["email"],
@@ -1,23 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Request
+from typing import List, Optional, Union
 from datetime import date
 import uuid
 import time
 from app.database.database import db
 from app.models.truck import (
     TruckInDB, TruckOut, AllDocuments, RCDetails, PUCDetails, TaxDetails,
-    InsuranceDetails, NationalPermitDetails, StatePermitDetails, FitnessDetails, EmiDetails
+    InsuranceDetails, NationalPermitDetails, StatePermitDetails, FitnessDetails, EmiDetails,
+    TruckSummary, TRUCK_SUMMARY_PROJECTION
 )
+from app.models.pagination import Page
 from app.routes.company import get_current_company
 from app.utils.aws_utils import upload_file_to_s3, start_document_text_detection, get_document_text_detection_results
 from app.utils.parser_utils import get_parser_for_doc_type
-from app.utils.email_utils import send_truck_added_email, send_truck_updated_email, send_truck_deleted_email
+from app.utils.email_utils import send_truck_added_email, send_truck_deleted_email
+from app.utils.notification_utils import record_change
+from app.utils.pagination_utils import paginate_find, DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
+from app.utils.projection_utils import resolve_fieldset, fieldset_response
+from app.utils.stream_utils import stream_documents, ensure_streamable, model_encoder, STREAM_BATCH_SIZE, STREAM_FORMATS
+from app.utils.serialization_utils import trusted_response, trusted_page_response, model_json_encoder
+from app.utils.version_utils import bump_version, check_etag, with_etag, read_versions
+from app.utils.cache_utils import truck_cache
+from app.utils.expiry_utils import truck_expiries
+from pymongo import ReturnDocument
 from bson import ObjectId
 import logging
 
 router = APIRouter()
 logging.basicConfig(level=logging.INFO)
 
+TRUCK_VIEWS = {"summary": (TRUCK_SUMMARY_PROJECTION, TruckSummary)}
+
 @router.post("/extract-document", status_code=status.HTTP_200_OK)
 async def extract_document_data(
     doc_type: str = Form(...),
@@ -144,7 +157,10 @@ async def add_truck(
 
     new_truck = TruckInDB(truck_number=truck_number_clean, model_number=model_number, engine_number=engine_number, chassis_number=chassis_number, registration_date=registration_date, tire_count=tire_count, truck_photo_url=truck_photo_url, company_id=company_id_obj, documents=all_docs, emi_details=emi_data)
     
-    result = db.trucks.insert_one(new_truck.dict(by_alias=True))
+    truck_doc = new_truck.dict(by_alias=True)
+    truck_doc["document_expiries"] = truck_expiries(truck_doc["documents"])
+    result = db.trucks.insert_one(truck_doc)
+    bump_version(company_id_obj, "trucks")
     created_truck = db.trucks.find_one({"_id": result.inserted_id})
     
     try:
@@ -152,26 +168,79 @@ async def add_truck(
         send_truck_added_email(
             to_email=company_details.get("email"),
             company_name=company_details.get("company_name"),
-            truck=created_truck
+            truck=created_truck,
+            uploads=documents
         )
     except Exception as e:
         logging.error(f"Failed to send truck added email for truck {created_truck['truck_number']}: {e}")
 
-    return TruckOut(**created_truck)
+    return trusted_response(TruckOut, created_truck, status_code=status.HTTP_201_CREATED)
 
-@router.get("/", response_model=List[TruckOut])
-def get_all_trucks(company: dict = Depends(get_current_company)):
+@router.get("/", response_model=Union[List[TruckOut], Page[TruckOut]])
+def get_all_trucks(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated TruckOut fields to return."),
+    view: Optional[str] = Query(None, enum=list(TRUCK_VIEWS)),
+    stream: Optional[str] = Query(None, enum=STREAM_FORMATS, description="Stream the full list as NDJSON or a chunked JSON array."),
+    company: dict = Depends(get_current_company)
+):
+    """
+    Lists the company's trucks. Without `limit`/`cursor` the full list is returned;
+    with either, a page ordered by truck number is returned along with `next_cursor`.
+    `fields` or `view` restrict both what is read from Mongo and what is returned.
+    `stream` sends the full list in batches straight from the cursor.
+    """
     company_id = ObjectId(company["company_id"])
-    trucks_cursor = db.trucks.find({"company_id": company_id})
-    return [TruckOut(**truck) for truck in trucks_cursor]
+    etag = check_etag(request, company_id, ("trucks",))
+    ensure_streamable(stream, limit, cursor)
+    paged = limit is not None or cursor is not None
+    fieldset = resolve_fieldset(TruckOut, fields, view, TRUCK_VIEWS, include=("truck_number",) if paged else ())
+    projection, out_model = fieldset or (None, TruckOut)
+
+    if stream:
+        trucks_cursor = db.trucks.find({"company_id": company_id}, projection).batch_size(STREAM_BATCH_SIZE)
+        encoder = model_encoder(out_model) if fieldset else model_json_encoder(TruckOut)
+        return with_etag(stream_documents(trucks_cursor, encoder, stream), etag)
+
+    next_cursor = None
+    if not paged:
+        trucks = db.trucks.find({"company_id": company_id}, projection)
+    else:
+        trucks, next_cursor = paginate_find(
+            db.trucks, {"company_id": company_id}, "truck_number", limit or DEFAULT_PAGE_LIMIT, cursor,
+            projection=projection
+        )
+    if fieldset:
+        return with_etag(fieldset_response([out_model(**truck) for truck in trucks], next_cursor, paged), etag)
+    if not paged:
+        return with_etag(trusted_response(TruckOut, trucks), etag)
+    return with_etag(trusted_page_response(TruckOut, trucks, next_cursor), etag)
 
 @router.get("/{truck_id}", response_model=TruckOut)
-def get_truck_by_id(truck_id: str, company: dict = Depends(get_current_company)):
+def get_truck_by_id(
+    request: Request,
+    truck_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated TruckOut fields to return."),
+    view: Optional[str] = Query(None, enum=list(TRUCK_VIEWS)),
+    company: dict = Depends(get_current_company)
+):
     company_id = ObjectId(company["company_id"])
-    truck = db.trucks.find_one({"_id": ObjectId(truck_id), "company_id": company_id})
+    versions = read_versions(company_id)
+    etag = check_etag(request, company_id, ("trucks",), versions=versions)
+    fieldset = resolve_fieldset(TruckOut, fields, view, TRUCK_VIEWS)
+    projection, out_model = fieldset or (None, TruckOut)
+    truck_query = {"_id": ObjectId(truck_id), "company_id": company_id}
+    if fieldset:
+        truck = truck_cache.get(company_id, truck_id, versions.get("trucks", 0)) or db.trucks.find_one(truck_query, projection)
+    else:
+        truck = truck_cache.get_or_load(company_id, truck_id, versions.get("trucks", 0), lambda: db.trucks.find_one(truck_query))
     if not truck:
         raise HTTPException(status_code=404, detail="Truck not found.")
-    return TruckOut(**truck)
+    if fieldset:
+        return with_etag(fieldset_response(out_model(**truck)), etag)
+    return with_etag(trusted_response(TruckOut, truck), etag)
 
 @router.delete("/{truck_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_truck(truck_id: str, company: dict = Depends(get_current_company)):
@@ -182,8 +251,10 @@ def delete_truck(truck_id: str, company: dict = Depends(get_current_company)):
         raise HTTPException(status_code=404, detail="Truck not found or you do not have permission to delete it.")
 
     delete_result = db.trucks.delete_one({"_id": ObjectId(truck_id)})
+    truck_cache.invalidate(company_id, truck_id)
     
     if delete_result.deleted_count > 0:
+        bump_version(company_id, "trucks", "assignments")
         try:
             company_details = company.get("company_data", {})
             send_truck_deleted_email(
@@ -241,25 +312,25 @@ async def update_truck_document(
     updated_doc_model = doc_models[doc_type](**extracted_info, s3_url=s3_url)
     
     update_query = {"$set": {f"documents.{doc_type}": updated_doc_model.dict()}}
+    documents = {**truck.get("documents", {}), doc_type: updated_doc_model.dict()}
     
     if doc_type == 'fitness':
         update_query["$set"]["documents.rc.expiry_date"] = updated_doc_model.main_expiry_date
+        documents["rc"] = {**(documents.get("rc") or {}), "expiry_date": updated_doc_model.main_expiry_date}
+    update_query["$set"]["document_expiries"] = truck_expiries(documents)
 
-    db.trucks.update_one({"_id": truck_id_obj}, update_query)
-    
-    updated_truck = db.trucks.find_one({"_id": truck_id_obj})
+    updated_truck = db.trucks.find_one_and_update(
+        {"_id": truck_id_obj, "company_id": company_id}, update_query, return_document=ReturnDocument.AFTER
+    )
+    truck_cache.invalidate(company_id, truck_id)
+    if not updated_truck:
+        raise HTTPException(status_code=404, detail="Truck not found.")
+    bump_version(company_id, "trucks", "assignments")
     
     try:
-        company_details = company.get("company_data", {})
-        send_truck_updated_email(
-            to_email=company_details.get("email"),
-            company_name=company_details.get("company_name"),
-            truck=updated_truck,
-            updated_doc_type=doc_type,
-            new_doc_url=s3_url 
-        )
+        record_change(company, "truck", truck_id_obj, {"doc_type": doc_type, "url": s3_url})
     except Exception as e:
-        logging.error(f"Failed to send truck updated email for truck {updated_truck['truck_number']}: {e}")
+        logging.error(f"Failed to record truck update notification for truck {updated_truck['truck_number']}: {e}")
     
-    return TruckOut(**updated_truck)
+    return trusted_response(TruckOut, updated_truck)
 
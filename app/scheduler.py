@@ -1,36 +1,134 @@
+import asyncio
 import logging
+import time
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from datetime import datetime, timedelta
 from app.database.database import db
+from app.utils.lease_utils import acquire_lease, ensure_lease, hold_lease, record_run, LeaseLost
+from app.utils.metrics_utils import register_metrics
+from app.utils.version_utils import bump_versions
+from app.utils.assignment_status_utils import archive_lapsed
+from app.utils.history_utils import drop_partition, expired_partitions, move_history_batch, next_month, partition_month
+from app.utils.archive_utils import export_partition
+from app.utils.rollup_utils import run_utilization_rollup
+from app.utils.expiry_utils import send_expiry_reminders
+from app.utils.notification_utils import flush_pending_notifications
+from app.config import COMPACTION_BATCH_SIZE, COMPACTION_MAX_BATCHES, COMPACTION_PAUSE_SECONDS, HISTORY_RETENTION_DAYS, NOTIFY_FLUSH_SECONDS
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def archive_old_assignments():
+def compact_lapsed_assignments():
     """
-    Finds active assignments older than 24 hours and moves them to 'history'.
+    Rewrites active assignments whose 24-hour window has passed to 'history', frees
+    their trucks and drivers, and moves history out of the hot `assignments`
+    collection into its monthly partition. Reads already treat lapsed records as
+    history, so this is only storage housekeeping: it works in small batches with a
+    pause in between so it never produces a write burst, and leaves any remainder for
+    the next run.
     """
-    logger.info("Scheduler: Running job to archive old assignments...")
-    twenty_four_hours_ago = datetime.utcnow() - timedelta(hours=24)
-    
-    result = db.assignments.update_many(
-        {"status": "active", "assignment_date": {"$lt": twenty_four_hours_ago}},
-        {"$set": {"status": "history", "completed_at": datetime.utcnow()}}
-    )
-    logger.info(f"Scheduler: Archived {result.modified_count} assignments.")
+    logger.info("Scheduler: Running job to compact lapsed assignments...")
+    archived = moved = 0
+    for batch in range(COMPACTION_MAX_BATCHES):
+        if batch:
+            time.sleep(COMPACTION_PAUSE_SECONDS)
+        ensure_lease()
+        archived_now = archive_lapsed({}, limit=COMPACTION_BATCH_SIZE)
+        moved_now = move_history_batch(COMPACTION_BATCH_SIZE)
+        archived += archived_now
+        moved += moved_now
+        if archived_now < COMPACTION_BATCH_SIZE and moved_now < COMPACTION_BATCH_SIZE:
+            break
+    logger.info(f"Scheduler: Compacted {archived} lapsed assignments, moved {moved} to history partitions.")
 
-def delete_very_old_assignments():
+def drain_month(month: datetime) -> int:
     """
-    Finds history assignments older than 30 days and deletes them permanently.
+    Moves everything of one month still sitting in the hot `assignments` collection
+    (lapsed active records and unmoved history) into its partition, so an export of the
+    partition covers the whole month.
     """
-    logger.info("Scheduler: Running job to delete very old assignment history...")
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    
-    result = db.assignments.delete_many(
-        {"status": "history", "assignment_date": {"$lt": thirty_days_ago}}
-    )
-    logger.info(f"Scheduler: Deleted {result.deleted_count} old history records.")
+    # $and keeps the month range from clashing with archive_lapsed's own assignment_date filter
+    in_month = {"assignment_date": {"$gte": month, "$lt": next_month(month)}}
+    moved = 0
+    while True:
+        ensure_lease()
+        archived_now = archive_lapsed({"$and": [in_month]}, limit=COMPACTION_BATCH_SIZE)
+        moved_now = move_history_batch(COMPACTION_BATCH_SIZE, in_month)
+        moved += moved_now
+        if archived_now < COMPACTION_BATCH_SIZE and moved_now < COMPACTION_BATCH_SIZE:
+            return moved
+
+def drop_expired_history():
+    """
+    Exports, then drops, monthly history partitions that lie entirely outside the
+    retention period. The month's records still in `assignments` are moved into the
+    partition first, then each company's month goes to cold storage as compressed JSONL
+    with a manifest; a partition is only dropped once all of its exports have succeeded.
+    Dropping a collection is a metadata operation, unlike deleting its documents.
+    """
+    logger.info("Scheduler: Running job to archive and drop expired assignment history...")
+    cutoff = datetime.utcnow() - timedelta(days=HISTORY_RETENTION_DAYS)
+    for name in expired_partitions(cutoff):
+        month = partition_month(name)
+        drained = drain_month(month)
+        if drained:
+            logger.info(f"Scheduler: Moved {drained} remaining records of {month:%Y-%m} into {name}.")
+        ensure_lease()
+        export_partition(name, month.strftime("%Y-%m"))
+        ensure_lease()
+        affected_companies = drop_partition(name)
+        bump_versions(affected_companies, "assignments")
+        logger.info(f"Scheduler: Dropped history partition {name}.")
+
+def leader_job(func, interval: timedelta):
+    """
+    Wraps a blocking job so that, across all workers and nodes, only the holder of the
+    job's lease runs it. The lease lasts most of one interval and is not released, so
+    a tick on another instance in the same period is skipped; if the holder dies the
+    lease lapses and the next tick anywhere takes over. While the job runs the lease is
+    renewed by a heartbeat, and a job that loses it anyway stops at its next
+    ensure_lease(). The body runs in a worker thread to keep the event loop free, and
+    each run is recorded on the lease.
+    """
+    name = func.__name__
+    ttl_seconds = max(int(interval.total_seconds() * 0.9), 1)
+
+    def body():
+        with hold_lease(name, ttl_seconds):
+            func()
+
+    async def run():
+        if not await asyncio.to_thread(acquire_lease, name, ttl_seconds):
+            logger.debug(f"Scheduler: Skipping {name}, lease held by another instance.")
+            return
+        started_at = datetime.utcnow()
+        start = time.perf_counter()
+        status, error = "success", None
+        try:
+            await asyncio.to_thread(body)
+        except LeaseLost:
+            logger.warning(f"Scheduler: Job {name} stopped, its lease was taken over.")
+            status, error = "lease_lost", None
+        except Exception as e:
+            logger.exception(f"Scheduler: Job {name} failed.")
+            status, error = "error", str(e)
+        duration_ms = int((time.perf_counter() - start) * 1000)
+        await asyncio.to_thread(record_run, name, started_at, duration_ms, status, error)
+
+    run.__name__ = name
+    return run
+
+def scheduler_metrics() -> dict:
+    return {
+        job["_id"]: {k: v for k, v in job.items() if k != "_id"}
+        for job in db.scheduler_leases.find()
+    }
+
+register_metrics("scheduler", scheduler_metrics)
 
 scheduler = AsyncIOScheduler()
-scheduler.add_job(archive_old_assignments, 'interval', hours=1) 
-scheduler.add_job(delete_very_old_assignments, 'interval', days=1)
+scheduler.add_job(leader_job(compact_lapsed_assignments, timedelta(minutes=15)), 'interval', minutes=15, max_instances=1, coalesce=True)
+scheduler.add_job(leader_job(run_utilization_rollup, timedelta(minutes=15)), 'interval', minutes=15, max_instances=1, coalesce=True)
+scheduler.add_job(leader_job(drop_expired_history, timedelta(days=1)), 'interval', days=1, max_instances=1, coalesce=True)
+scheduler.add_job(leader_job(send_expiry_reminders, timedelta(days=1)), 'interval', days=1, max_instances=1, coalesce=True)
+scheduler.add_job(leader_job(flush_pending_notifications, timedelta(seconds=NOTIFY_FLUSH_SECONDS)), 'interval', seconds=NOTIFY_FLUSH_SECONDS, max_instances=1, coalesce=True)
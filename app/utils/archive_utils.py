@@ -0,0 +1,199 @@
+# app/utils/archive_utils.py
+
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from typing import Iterator, List, Optional
+from bson import ObjectId
+from botocore.exceptions import ClientError
+from app.config import ARCHIVE_DIR, ARCHIVE_S3_BUCKET, ARCHIVE_COMPRESSION, ARCHIVE_BATCH_SIZE
+from app.database.database import db
+from app.utils.aws_utils import s3_client
+from app.utils.serialization_utils import dumps
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstd is optional, gzip is always available
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+ARCHIVE_PREFIX = "assignment-history"
+MEDIA_TYPES = {"gzip": "application/gzip", "zstd": "application/zstd"}
+EXTENSIONS = {"gzip": "gz", "zstd": "zst"}
+
+class LocalArchiveStore:
+    """Archive storage in a local directory; used for development and tests."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def put_file(self, key: str, fileobj, content_type: str):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.part", "wb") as out:
+            shutil.copyfileobj(fileobj, out, CHUNK_SIZE)
+        os.replace(f"{path}.part", path)
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def iter_chunks(self, key: str) -> Iterator[bytes]:
+        with open(self._path(key), "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                yield chunk
+
+class S3ArchiveStore:
+    """Archive storage in an S3 bucket."""
+
+    def __init__(self, bucket: str):
+        self.bucket = bucket
+        self.client = s3_client
+
+    def put_file(self, key: str, fileobj, content_type: str):
+        self.client.upload_fileobj(fileobj, self.bucket, key, ExtraArgs={"ContentType": content_type})
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                return None
+            raise
+
+    def iter_chunks(self, key: str) -> Iterator[bytes]:
+        body = self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+        try:
+            yield from body.iter_chunks(CHUNK_SIZE)
+        finally:
+            body.close()
+
+def get_archive_store():
+    """ARCHIVE_DIR selects local storage; otherwise archives go to ARCHIVE_S3_BUCKET."""
+    if ARCHIVE_DIR:
+        return LocalArchiveStore(ARCHIVE_DIR)
+    if not ARCHIVE_S3_BUCKET:
+        raise RuntimeError("Neither ARCHIVE_DIR nor ARCHIVE_S3_BUCKET is configured.")
+    return S3ArchiveStore(ARCHIVE_S3_BUCKET)
+
+def archive_compression() -> str:
+    if ARCHIVE_COMPRESSION == "zstd" and zstandard is None:
+        logger.warning("ARCHIVE_COMPRESSION=zstd but zstandard is not installed; using gzip.")
+        return "gzip"
+    return ARCHIVE_COMPRESSION if ARCHIVE_COMPRESSION in EXTENSIONS else "gzip"
+
+# A (company, month) is archived as one or more parts. The first export writes
+# <month>.jsonl.<ext> and <month>.manifest.json; records that reach an already archived
+# month later (a re-run, or a partition that was recreated) go to the next free
+# sequence number, <month>.<seq>.jsonl.<ext> and <month>.<seq>.manifest.json, so an
+# archive is never overwritten.
+
+def _part_suffix(seq: int) -> str:
+    return f".{seq}" if seq else ""
+
+def archive_key(company_id, month: str, compression: str, seq: int = 0) -> str:
+    return f"{ARCHIVE_PREFIX}/{company_id}/{month}{_part_suffix(seq)}.jsonl.{EXTENSIONS[compression]}"
+
+def manifest_key(company_id, month: str, seq: int = 0) -> str:
+    return f"{ARCHIVE_PREFIX}/{company_id}/{month}{_part_suffix(seq)}.manifest.json"
+
+def _load_manifests(store, company_id, month: str) -> List[dict]:
+    manifests = []
+    while (raw := store.get_bytes(manifest_key(company_id, month, len(manifests)))) is not None:
+        manifests.append(json.loads(raw))
+    return manifests
+
+def _compressor(fileobj, compression: str):
+    if compression == "zstd":
+        return zstandard.ZstdCompressor().stream_writer(fileobj, closefd=False)
+    return gzip.GzipFile(fileobj=fileobj, mode="wb", mtime=0)
+
+def export_company_month(collection, company_id: ObjectId, month: str, store, compression: str) -> dict:
+    """
+    Streams one company's records from a history partition into a compressed JSONL file
+    (one assignment per line, oldest first) and uploads it as the month's next part,
+    followed by its manifest. Records are read in ARCHIVE_BATCH_SIZE batches and spooled
+    through a temporary file, so memory use does not grow with the partition. A part
+    identical to one already archived (an export retried before its partition was
+    dropped) is not written again.
+    """
+    existing = _load_manifests(store, company_id, month)
+    if existing:
+        # Parts are served back to back as one file, so they share a compression
+        compression = existing[0]["compression"]
+    seq = len(existing)
+    records, first_date, last_date = 0, None, None
+    with tempfile.TemporaryFile() as spool:
+        with _compressor(spool, compression) as out:
+            cursor = collection.find({"company_id": company_id}).sort("assignment_date", 1).batch_size(ARCHIVE_BATCH_SIZE)
+            for doc in cursor:
+                out.write(dumps(doc) + b"\n")
+                records += 1
+                first_date = first_date or doc["assignment_date"]
+                last_date = doc["assignment_date"]
+        size = spool.tell()
+        spool.seek(0)
+        digest = hashlib.sha256()
+        while chunk := spool.read(CHUNK_SIZE):
+            digest.update(chunk)
+        for manifest in existing:
+            if manifest["sha256"] == digest.hexdigest():
+                return manifest
+        spool.seek(0)
+        key = archive_key(company_id, month, compression, seq)
+        store.put_file(key, spool, MEDIA_TYPES[compression])
+
+    manifest = {
+        "company_id": str(company_id),
+        "month": month,
+        "part": seq,
+        "key": key,
+        "compression": compression,
+        "records": records,
+        "bytes": size,
+        "sha256": digest.hexdigest(),
+        "first_assignment_date": first_date.isoformat() if first_date else None,
+        "last_assignment_date": last_date.isoformat() if last_date else None,
+        "exported_at": datetime.utcnow().isoformat()
+    }
+    # The manifest is written last, so its presence means the data file is complete.
+    store.put_file(manifest_key(company_id, month, seq), io.BytesIO(json.dumps(manifest, indent=2).encode("utf-8")), "application/json")
+    return manifest
+
+def export_partition(name: str, month: str) -> List[dict]:
+    """Exports every company's records in a history partition; returns the manifests."""
+    store, compression = get_archive_store(), archive_compression()
+    collection = db[name]
+    manifests = [
+        export_company_month(collection, company_id, month, store, compression)
+        for company_id in collection.distinct("company_id")
+    ]
+    logger.info(f"Archived {sum(m['records'] for m in manifests)} records from {name} for {len(manifests)} companies.")
+    return manifests
+
+def load_manifests(company_id, month: str) -> List[dict]:
+    """Manifests of every archived part of a company's month, in export order."""
+    return _load_manifests(get_archive_store(), company_id, month)
+
+def iter_archive(keys: List[str]) -> Iterator[bytes]:
+    """
+    Streams parts back to back. Concatenated gzip members (and zstd frames) decompress
+    as one stream, so several parts read as a single JSONL file.
+    """
+    store = get_archive_store()
+    for key in keys:
+        yield from store.iter_chunks(key)
@@ -0,0 +1,86 @@
+# app/utils/assignment_status_utils.py
+
+from datetime import datetime
+from typing import Iterable, Optional
+from bson import ObjectId
+from pymongo import UpdateOne
+from app.database.database import db
+from app.utils.availability_utils import ACTIVE_WINDOW, release_assignments
+
+ACTIVE_WINDOW_MS = int(ACTIVE_WINDOW.total_seconds() * 1000)
+
+def active_cutoff(now: Optional[datetime] = None) -> datetime:
+    """Assignments dated before this instant have lapsed into history."""
+    return (now or datetime.utcnow()) - ACTIVE_WINDOW
+
+def status_filter(status: str, now: Optional[datetime] = None) -> dict:
+    """
+    Mongo filter for assignments whose effective status is `status`. Both branches
+    are served by the {company_id, status, assignment_date} index.
+    """
+    cutoff = active_cutoff(now)
+    if status == "active":
+        return {"status": "active", "assignment_date": {"$gte": cutoff}}
+    return {"$or": [
+        {"status": "history"},
+        {"status": "active", "assignment_date": {"$lt": cutoff}}
+    ]}
+
+def effective_fields(now: Optional[datetime] = None) -> dict:
+    """
+    $project expressions for `status` and `completed_at` as reads should see them.
+    A lapsed assignment reports completion at the end of its active window.
+    """
+    lapsed = {"$and": [
+        {"$eq": ["$status", "active"]},
+        {"$lt": ["$assignment_date", active_cutoff(now)]}
+    ]}
+    return {
+        "status": {"$cond": [lapsed, "history", "$status"]},
+        "completed_at": {"$cond": [lapsed, {"$add": ["$assignment_date", ACTIVE_WINDOW_MS]}, "$completed_at"]}
+    }
+
+def status_epoch(company_id: ObjectId, now: Optional[datetime] = None) -> str:
+    """
+    Changes whenever a company's effective active set changes through time alone: the
+    oldest active assignment is always the next to lapse. Used as an ETag variant.
+    """
+    oldest = db.assignments.find_one(
+        {"company_id": company_id, **status_filter("active", now)},
+        {"assignment_date": 1},
+        sort=[("assignment_date", 1)]
+    )
+    return oldest["assignment_date"].isoformat() if oldest else ""
+
+def archive_lapsed(query: dict, limit: Optional[int] = None) -> int:
+    """
+    Rewrites lapsed assignments matching `query` to history, setting completed_at to the
+    end of their window, and frees their trucks and drivers. The effective status does
+    not change, so no data version is bumped.
+    """
+    cursor = db.assignments.find(
+        {**query, "status": "active", "assignment_date": {"$lt": active_cutoff()}},
+        {"company_id": 1, "truck_id": 1, "driver_id": 1, "assignment_date": 1}
+    )
+    if limit:
+        cursor = cursor.limit(limit)
+    lapsed = list(cursor)
+    if not lapsed:
+        return 0
+    now = datetime.utcnow()
+    db.assignments.bulk_write([
+        UpdateOne(
+            {"_id": a["_id"], "status": "active"},
+            {"$set": {"status": "history", "completed_at": a["assignment_date"] + ACTIVE_WINDOW, "updated_at": now}}
+        )
+        for a in lapsed
+    ], ordered=False)
+    release_assignments(lapsed)
+    return len(lapsed)
+
+def archive_lapsed_for(company_id: ObjectId, truck_ids: Iterable[ObjectId], driver_ids: Iterable[ObjectId]) -> int:
+    """Targeted compaction that frees specific trucks and drivers before they are re-assigned."""
+    return archive_lapsed({
+        "company_id": company_id,
+        "$or": [{"truck_id": {"$in": list(truck_ids)}}, {"driver_id": {"$in": list(driver_ids)}}]
+    })
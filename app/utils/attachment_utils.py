@@ -0,0 +1,142 @@
+# app/utils/attachment_utils.py
+
+import base64
+import logging
+import mimetypes
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse, unquote
+from sendgrid.helpers.mail import Attachment, FileContent, FileName, FileType, Disposition
+from app.config import EMAIL_ATTACHMENT_BUDGET_BYTES, EMAIL_LINK_EXPIRY_SECONDS
+from app.utils.aws_utils import s3_client, S3_BUCKET_NAME
+
+logger = logging.getLogger(__name__)
+
+# Read in multiples of 3 bytes so each chunk encodes to base64 without padding and the
+# encoded pieces can simply be joined.
+ENCODE_CHUNK_SIZE = 3 * 64 * 1024
+FETCH_WORKERS = 8
+
+def encoded_size(size: int) -> int:
+    return (size + 2) // 3 * 4
+
+def encode_stream(read) -> str:
+    """Base64-encodes a stream chunk by chunk, never holding the raw bytes in full."""
+    pieces = []
+    while chunk := read(ENCODE_CHUNK_SIZE):
+        pieces.append(base64.b64encode(chunk).decode())
+    return "".join(pieces)
+
+def object_key(url: str) -> Optional[str]:
+    """The S3 key of one of our bucket's object URLs, as returned by upload_file_to_s3."""
+    parsed = urlparse(url or "")
+    if not S3_BUCKET_NAME or not parsed.netloc.startswith(f"{S3_BUCKET_NAME}.s3"):
+        return None
+    return unquote(parsed.path.lstrip("/")) or None
+
+def _filename(name: str, content_type: Optional[str]) -> str:
+    extension = mimetypes.guess_extension(content_type or "") or ".pdf"
+    return f"{name}{'.jpg' if extension == '.jpe' else extension}"
+
+def _describe(document: dict) -> dict:
+    """Size and content type of a document, from the upload we hold or from S3."""
+    upload = document.get("upload")
+    if upload is not None:
+        upload.file.seek(0, os.SEEK_END)
+        size = upload.file.tell()
+        upload.file.seek(0)
+        return {**document, "key": object_key(document.get("url")), "size": size, "content_type": upload.content_type}
+    key = object_key(document.get("url"))
+    if key is None:
+        return {**document, "key": None, "size": None, "content_type": None}
+    head = s3_client.head_object(Bucket=S3_BUCKET_NAME, Key=key)
+    return {**document, "key": key, "size": head["ContentLength"], "content_type": head.get("ContentType")}
+
+def _encode(document: dict) -> str:
+    upload = document.get("upload")
+    if upload is not None:
+        upload.file.seek(0)
+        return encode_stream(upload.file.read)
+    body = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=document["key"])["Body"]
+    try:
+        return encode_stream(body.read)
+    finally:
+        body.close()
+
+def _presigned_link(document: dict) -> Optional[str]:
+    if not document.get("key"):
+        return document.get("url")
+    return s3_client.generate_presigned_url(
+        "get_object",
+        Params={"Bucket": S3_BUCKET_NAME, "Key": document["key"]},
+        ExpiresIn=EMAIL_LINK_EXPIRY_SECONDS
+    )
+
+def prepare_attachments(documents: List[dict], budget: int = EMAIL_ATTACHMENT_BUDGET_BYTES) -> Tuple[List[Attachment], List[dict]]:
+    """
+    Turns documents into email attachments within `budget` bytes of encoded content
+    (EMAIL_ATTACHMENT_BUDGET_BYTES by default). Each document has a `name`, the `url`
+    it was stored at and, when the request still holds it, the `upload` it came from;
+    uploads are encoded from memory and everything else is fetched through the S3
+    client, concurrently. Documents that do not fit the budget (or cannot be read) are
+    returned as links that expire after EMAIL_LINK_EXPIRY_SECONDS instead. With a
+    budget of 0 every document is linked without touching S3.
+    """
+    if not documents:
+        return [], []
+    if budget <= 0:
+        return [], _links([{**document, "key": object_key(document.get("url"))} for document in documents])
+    with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(documents))) as pool:
+        described = list(pool.map(_safe_describe, documents))
+
+        to_attach, to_link = [], []
+        for document in described:
+            size = document.get("size")
+            if size is not None and encoded_size(size) <= budget:
+                budget -= encoded_size(size)
+                to_attach.append(document)
+            else:
+                to_link.append(document)
+
+        encoded = list(pool.map(_safe_encode, to_attach))
+
+    attachments = []
+    for document, content in zip(to_attach, encoded):
+        if content is None:
+            to_link.append(document)
+            continue
+        attachments.append(Attachment(
+            FileContent(content),
+            FileName(_filename(document["name"], document.get("content_type"))),
+            FileType(document.get("content_type") or "application/pdf"),
+            Disposition("attachment")
+        ))
+
+    return attachments, _links(to_link)
+
+def _links(documents: List[dict]) -> List[dict]:
+    links = []
+    for document in documents:
+        try:
+            url = _presigned_link(document)
+        except Exception as e:
+            logger.error(f"Failed to create a download link for {document['name']}: {e}")
+            url = None
+        if url:
+            links.append({"name": document["name"], "url": url})
+    return links
+
+def _safe_describe(document: dict) -> dict:
+    try:
+        return _describe(document)
+    except Exception as e:
+        logger.error(f"Failed to look up {document['name']} for attaching: {e}")
+        return {**document, "key": object_key(document.get("url")), "size": None, "content_type": None}
+
+def _safe_encode(document: dict) -> Optional[str]:
+    try:
+        return _encode(document)
+    except Exception as e:
+        logger.error(f"Failed to read {document['name']} for attaching: {e}")
+        return None
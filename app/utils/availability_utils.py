@@ -0,0 +1,69 @@
+# app/utils/availability_utils.py
+
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+from bson import ObjectId
+from pymongo import UpdateOne
+from app.config import ASSIGNMENT_ACTIVE_HOURS
+from app.database.database import db
+from app.utils.cache_utils import truck_cache, driver_cache
+
+# An assignment is effectively active for this long after its assignment_date, whether
+# or not compaction has rewritten its stored status yet.
+ACTIVE_WINDOW = timedelta(hours=ASSIGNMENT_ACTIVE_HOURS)
+
+# Trucks and drivers carry `active_assignment_id`, the _id of the assignment they are
+# on (null when free), and `assigned_until`, when that assignment lapses. Each is
+# indexed together with company_id, so both branches of the filter are index scans.
+def available_filter(now: Optional[datetime] = None) -> dict:
+    return {"$or": [
+        {"active_assignment_id": None},
+        {"assigned_until": {"$lte": now or datetime.utcnow()}}
+    ]}
+
+def is_available(resource: dict, now: Optional[datetime] = None) -> bool:
+    """In-memory counterpart of available_filter for an already loaded truck or driver."""
+    if not resource.get("active_assignment_id"):
+        return True
+    assigned_until = resource.get("assigned_until")
+    return assigned_until is not None and assigned_until <= (now or datetime.utcnow())
+
+def mark_assigned(company_id: ObjectId, assignments: Iterable[dict]):
+    """
+    Records that the trucks and drivers of freshly inserted assignment documents are
+    on those assignments until their active window ends.
+    """
+    assignments = list(assignments)
+    if not assignments:
+        return
+    for collection, field, cache in ((db.trucks, "truck_id", truck_cache), (db.drivers, "driver_id", driver_cache)):
+        collection.bulk_write([
+            UpdateOne(
+                {"_id": a[field], "company_id": company_id},
+                {"$set": {"active_assignment_id": a["_id"], "assigned_until": a["assignment_date"] + ACTIVE_WINDOW}}
+            )
+            for a in assignments
+        ], ordered=False)
+        for a in assignments:
+            cache.invalidate(company_id, a[field])
+
+def release_assignments(assignments: Iterable[dict]):
+    """
+    Frees the trucks and drivers held by the given assignment documents (which need
+    `_id`, `company_id`, `truck_id` and `driver_id`). A resource is only cleared while
+    it still points at that assignment, so a newer assignment is never released.
+    """
+    assignments = list(assignments)
+    assignment_ids = [a["_id"] for a in assignments]
+    if not assignment_ids:
+        return
+    held = {
+        "company_id": {"$in": list({a["company_id"] for a in assignments})},
+        "active_assignment_id": {"$in": assignment_ids}
+    }
+    free = {"$set": {"active_assignment_id": None, "assigned_until": None}}
+    db.trucks.update_many(held, free)
+    db.drivers.update_many(held, free)
+    for a in assignments:
+        truck_cache.invalidate(a["company_id"], a.get("truck_id"))
+        driver_cache.invalidate(a["company_id"], a.get("driver_id"))
@@ -0,0 +1,110 @@
+# app/utils/cache_utils.py
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+import bson
+from app.config import ENTITY_CACHE_MAX_BYTES, ENTITY_CACHE_TTL_SECONDS
+from app.utils.metrics_utils import register_metrics
+
+class EntityCache:
+    """
+    In-process LRU + TTL cache of Mongo documents, scoped by company.
+
+    Entries are kept BSON-encoded: the encoded length gives an exact memory bound and
+    every hit decodes a fresh copy, so callers can never mutate what is cached.
+    Each worker holds its own cache, so entries are tagged with the company's data
+    version (see version_utils) read before the document was loaded; a lookup with a
+    different version is a miss, which makes writes from any worker visible at once.
+    The TTL only bounds memory held by entries that are no longer read.
+    """
+
+    def __init__(self, name: str, max_bytes: int = ENTITY_CACHE_MAX_BYTES, ttl_seconds: int = ENTITY_CACHE_TTL_SECONDS):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        register_metrics(f"cache.{name}", self.stats)
+
+    @staticmethod
+    def _key(company_id, entity_id) -> tuple:
+        return (str(company_id), str(entity_id))
+
+    def get(self, company_id, entity_id, version) -> Optional[dict]:
+        key = self._key(company_id, entity_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            raw, expires_at, entry_version = entry
+            if expires_at <= time.monotonic() or entry_version != version:
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return bson.decode(raw)
+
+    def put(self, company_id, entity_id, doc: Optional[dict], version):
+        """Caches `doc` as loaded at data version `version`, read before loading it."""
+        if doc is None:
+            self.invalidate(company_id, entity_id)
+            return
+        raw = bson.encode(doc)
+        if len(raw) > self.max_bytes:
+            return
+        key = self._key(company_id, entity_id)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (raw, time.monotonic() + self.ttl_seconds, version)
+            self._size += len(raw)
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def invalidate(self, company_id, entity_id):
+        with self._lock:
+            self._drop(self._key(company_id, entity_id))
+
+    def get_or_load(self, company_id, entity_id, version, loader: Callable[[], Optional[dict]]) -> Optional[dict]:
+        """
+        Read-through lookup: returns the document cached at `version` or calls `loader`
+        and caches its result. Misses that load nothing are not cached.
+        """
+        doc = self.get(company_id, entity_id, version)
+        if doc is not None:
+            return doc
+        doc = loader()
+        if doc is not None:
+            self.put(company_id, entity_id, doc, version)
+        return doc
+
+    def _drop(self, key: tuple):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[0])
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+truck_cache = EntityCache("trucks")
+driver_cache = EntityCache("drivers")
@@ -0,0 +1,236 @@
+# app/utils/email_templates.py
+#
+# HTML sources for the emails sent by email_utils, compiled once at import. Layouts
+# carry the shared header and footer and receive the email body as {content};
+# fragments are small reusable pieces (buttons, table rows, document cards).
+
+from app.utils.template_utils import register_template
+
+# --- Layouts ---------------------------------------------------------------------------
+
+register_template("layout.card", """
+    <html>
+    <body style="font-family: Arial, sans-serif; padding: 20px;">
+        <div style="max-width: 600px; margin: auto; border: 1px solid #eee; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
+            <div style="background-color: #0044cc; padding: 20px; border-radius: 10px 10px 0 0; color: white;">
+                <h2>{title}</h2>
+            </div>
+            <div style="padding: 20px;">{content}
+            </div>
+            <div style="background-color: #f4f4f4; padding: 15px; text-align: center; border-radius: 0 0 10px 10px; font-size: 12px; color: #888;">
+                © {year} FleetDocs. All rights reserved.
+            </div>
+        </div>
+    </body>
+    </html>
+    """)
+
+register_template("layout.dark", """
+    <html>
+    <body style="font-family: Arial, sans-serif; background-color: #f4f4f4; margin: 0; padding: 20px;">
+        <div style="max-width: 650px; margin: auto; border: 1px solid #ddd; background-color: #2D2D44; color: #fff; border-radius: 10px;">
+            <div style="background-color: #1A1A2E; padding: 20px; border-radius: 10px 10px 0 0; text-align: center;">
+                <h2 style="color: #FFCA28; margin: 0;">{title}</h2>
+            </div>
+            <div style="padding: 25px;">{content}
+            </div>
+            <div style="background-color: #1A1A2E; padding: 15px; text-align: center; border-radius: 0 0 10px 10px; font-size: 12px; color: #888;">
+                © {year} FleetDocs. All rights reserved.
+            </div>
+        </div>
+    </body>
+    </html>
+    """)
+
+register_template("layout.light", """
+    <html>
+    <body style="font-family: Arial, sans-serif; padding: 20px; color: #333;">
+        <div style="max-width: 600px; margin: auto; border: 1px solid #ddd; border-radius: 10px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
+            <div style="background-color: #1A1A2E; padding: 20px; border-radius: 10px 10px 0 0; text-align: center;">
+                <h2 style="color: #FFCA28; margin: 0;">{title}</h2>
+            </div>
+            <div style="padding: 25px;">{content}
+            </div>
+            <div style="background-color: #f4f4f4; padding: 15px; text-align: center; border-radius: 0 0 10px 10px; font-size: 12px; color: #888;">
+                © {year} FleetDocs. All rights reserved.
+            </div>
+        </div>
+    </body>
+    </html>
+    """)
+
+register_template("layout.plain", """
+    <html>
+    <body>
+        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: auto; border: 1px solid #ddd; padding: 20px;">
+            <h2 style="color: #1A1A2E;">{title}</h2>{content}
+        </div>
+    </body>
+    </html>
+    """)
+
+# --- Fragments -------------------------------------------------------------------------
+
+register_template("fragment.button", """
+                <p style="text-align: center;">
+                    <a href="{url}" style="display: inline-block; background-color: {color}; color: white; padding: {padding}; text-decoration: none; border-radius: 5px;">
+                        {label}
+                    </a>
+                </p>""")
+
+register_template("fragment.detail_row",
+    '<tr><td style="padding: 4px; color: #bbb;">{label}</td><td style="padding: 4px; {value_style}font-weight: 600;">{value}</td></tr>')
+
+register_template("fragment.document_card", """
+            <div style="{card_style} border-radius: 8px; padding: 15px; margin-bottom: 10px;">
+                <h4 style="margin: 0 0 10px 0; border-bottom: 1px solid #444; padding-bottom: 5px; {heading_style}">{name}</h4>
+                <table style="width: 100%; border-collapse: collapse; font-size: 14px; {table_style}">
+                    {rows}
+                </table>
+            </div>
+        """)
+
+register_template("fragment.document_link",
+    '<li style="margin: 4px 0;"><a href="{url}" style="color: #FFCA28;">{name}</a></li>')
+
+register_template("fragment.document_links", """
+                <h3 style="color: #FFCA28;">Download Documents</h3>
+                <p style="color: #ccc;">These documents were too large to attach. The links expire in {days} day(s).</p>
+                <ul style="padding-left: 20px;">{items}</ul>
+    """)
+
+register_template("fragment.profile_row",
+    '<tr><td style="padding: 8px; border-bottom: 1px solid #eee; color: #888;">{key}</td><td style="padding: 8px; border-bottom: 1px solid #eee;"><strong>{value}</strong></td></tr>')
+
+register_template("fragment.expiry_row", """
+                <tr>
+                    <td style="padding: 8px; border-bottom: 1px solid #eee;">{label}</td>
+                    <td style="padding: 8px; border-bottom: 1px solid #eee;">{document}</td>
+                    <td style="padding: 8px; border-bottom: 1px solid #eee;">{expiry_date:%d %B %Y}</td>
+                    <td style="padding: 8px; border-bottom: 1px solid #eee; color: {color};">
+                        {time_left}
+                    </td>
+                </tr>""")
+
+# --- Emails ----------------------------------------------------------------------------
+
+register_template("contact_confirmation", """
+                <p>Hi <strong>{company_name}</strong>,</p>
+                <p>Thank you for contacting <strong>FleetDocs</strong>. We have received your request and our team will reach out to you shortly.</p>
+                <p>Best regards,<br>FleetDocs Team</p>""", layout="layout.card")
+
+register_template("reset", """
+                <p>Hello,</p>
+                <p>We received a request to reset your password for your <strong>FleetDocs</strong> account.</p>
+                <p>Please click the button below to reset your password:</p>{button}
+                <p>If you didn’t request this, you can safely ignore this email.</p>
+                <p>Thanks,<br>FleetDocs Team</p>""", layout="layout.card")
+
+register_template("payment_instructions", """
+                <p>Dear Customer,</p>
+                <p>Your payment of <strong>{amount_due}</strong> is due by <strong>{due_date}</strong>.</p>
+                <p>Please click the button below to complete your payment securely:</p>{button}
+                <p>Thank you for your prompt attention.</p>
+                <p>Best regards,<br>FleetDocs Billing Team</p>""", layout="layout.card")
+
+register_template("credential.password", """
+                <p>Your temporary password is: <strong>{temporary_password}</strong></p>
+                <p>Please log in and change your password immediately.</p>""")
+
+register_template("credential.reset", """
+                <p>If you need to reset your password, click the link below:</p>{button}""")
+
+register_template("credential", """
+                <p>Hello <strong>{username}</strong>,</p>{password_section}{reset_section}
+                <p>If you have any questions, please contact support.</p>
+                <p>Best regards,<br>FleetDocs Team</p>""", layout="layout.card")
+
+register_template("password_change_notification", """
+            <p>Hello {company_name},</p>
+            <p>This is to confirm that the password for your FleetDocs account was successfully changed on <strong>{change_time}</strong>.</p>
+            <p>If you made this change, you can safely disregard this email.</p>
+            <hr>
+            <p style="color: #E53935; font-weight: bold;">If you did NOT make this change, your account may be compromised.</p>
+            <p>Please secure your account immediately by clicking the link below:</p>{button}
+            <p>Thank you for using FleetDocs.</p>""", layout="layout.plain")
+
+register_template("account_recovery_credentials", """
+            <p>Hello {company_name},</p>
+            <p>Your account has been successfully recovered. We have generated a new temporary password for you to regain access.</p>
+            <p>Please use the following credentials to log in:</p>
+            <ul style="list-style-type: none; padding: 0;">
+                <li><strong>Username:</strong> {username}</li>
+                <li><strong>New Temporary Password:</strong> <strong style="color: #0044cc;">{new_password}</strong></li>
+            </ul>
+            <p style="font-weight: bold; color: #E53935;">For your security, you will be required to set a new password immediately after logging in.</p>
+            <p>Thank you,<br>The FleetDocs Team</p>""", layout="layout.plain")
+
+register_template("truck_added", """
+                <p style="color: #ccc;">Hello {company_name},</p>
+                <p style="color: #ccc;">This email confirms that a new truck, <strong>{truck_number}</strong>, was successfully added to your FleetDocs account on {added_time}.</p>
+                <img src="{truck_photo_url}" alt="Truck Photo" style="width: 100%; max-width: 400px; border-radius: 8px; margin: 15px auto; display: block;">
+
+                <h3 style="color: #FFCA28; border-top: 1px solid #444; padding-top: 20px;">Vehicle Details</h3>
+                <table style="width: 100%; border-collapse: collapse; font-size: 14px; margin-bottom: 20px;">
+                    {vehicle_rows}
+                </table>
+
+                <h3 style="color: #FFCA28;">Document Summary</h3>
+                {documents}
+                {links}""", layout="layout.dark")
+
+register_template("truck_updated", """
+                <p style="color: #ccc;">Hello {company_name},</p>
+                <p style="color: #ccc;">This email confirms that the <strong>{doc_types}</strong> {document_word} for truck <strong>{truck_number}</strong> {verb} updated on {updated_time}.</p>
+
+                <h3 style="color: #FFCA28; border-top: 1px solid #444; padding-top: 20px;">Document Summary</h3>
+                {documents}
+                {links}""", layout="layout.dark")
+
+register_template("truck_deleted", """
+                <p style="color: #ccc;">Hello {company_name},</p>
+                <p style="color: #ccc;">This is to confirm that the truck with registration number <strong>{truck_number}</strong> was successfully deleted from your FleetDocs account on {deleted_time}.</p>
+                <p style="color: #ccc;">This action cannot be undone.</p>
+                <p style="color: #ccc;">If you did not authorize this action, please contact support immediately.</p>""", layout="layout.dark")
+
+register_template("driver_added", """
+                <p style="color: #ccc;">Hello {company_name},</p>
+                <p style="color: #ccc;">This email confirms that a new driver, <strong>{driver_name}</strong>, was added to your FleetDocs account on {added_time}.</p>
+                <img src="{driver.driver_photo_url}" alt="Driver Photo" style="width: 120px; height: 120px; border-radius: 60px; margin: 15px auto; display: block; border: 2px solid #FFCA28;">
+
+                <h3 style="color: #FFCA28; border-top: 1px solid #444; padding-top: 20px;">Driver Details</h3>
+                <p style="color: #fff;"><strong>Phone:</strong> {driver.phone_number}</p>
+                <p style="color: #fff;"><strong>Email:</strong> {email}</p>
+
+                <h3 style="color: #FFCA28;">License Details</h3>
+                <p style="color: #fff;"><strong>Number:</strong> {driver.license.license_number}</p>
+                <p style="color: #fff;"><strong>NT Validity:</strong> {driver.license.validity_nt}</p>
+                <p style="color: #fff;"><strong>TR Validity:</strong> {driver.license.validity_tr}</p>""", layout="layout.dark")
+
+register_template("driver_updated", """
+            <p>Hello {company_name},</p>
+            <p>This is to confirm that the <strong>{update_type}</strong> for driver <strong>{driver_name}</strong> was updated on {updated_time}.</p>
+            <p><strong>New Phone Number:</strong> {driver.phone_number}</p>
+            <p><strong>New License Number:</strong> {driver.license.license_number}</p>
+            <p>Please review these changes in your FleetDocs dashboard.</p>""", layout="layout.plain")
+
+register_template("profile_update", """
+                <p>Hello {company_name},</p>
+                <p>This is to confirm that your company profile details have been successfully updated on FleetDocs. Your new details are listed below:</p>
+                <table style="width: 100%; border-collapse: collapse; margin-top: 20px; background-color: #f9f9f9;">
+                    {rows}
+                </table>
+                <p style="margin-top: 20px;">If you did not authorize this change, please contact our support team immediately.</p>""", layout="layout.light")
+
+register_template("expiry_digest", """
+            <p>Hello {company_name},</p>
+            <p>The following documents are expiring or have expired. Please renew them and upload the new copies in your FleetDocs dashboard.</p>
+            <table style="width: 100%; border-collapse: collapse; font-size: 14px;">
+                <tr style="background-color: #f4f4f4; text-align: left;">
+                    <th style="padding: 8px;">Truck / Driver</th>
+                    <th style="padding: 8px;">Document</th>
+                    <th style="padding: 8px;">Expiry Date</th>
+                    <th style="padding: 8px;">Time Left</th>
+                </tr>{rows}
+            </table>
+            <p>Thank you for using FleetDocs.</p>""", layout="layout.plain")
@@ -0,0 +1,200 @@
+# app/utils/expiry_utils.py
+
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from pymongo.errors import BulkWriteError
+from app.config import (
+    EXPIRY_REMINDER_DAYS, EXPIRY_REMINDER_LOOKBACK_DAYS, EXPIRY_REMINDER_WORKERS, EXPIRY_REMINDER_SMS
+)
+from app.database.database import db
+from app.models.truck import TRUCK_DOC_EXPIRY_FIELDS
+from app.utils.email_utils import send_expiry_digest_email
+from app.utils.sms_utils import send_sms
+
+logger = logging.getLogger(__name__)
+
+# Trucks and drivers keep a flat `document_expiries` list ([{"doc", "date"}]) next to
+# their documents, so a single multikey index on `document_expiries.date` answers
+# "what expires in this window" for every company at once.
+DOC_LABELS = {
+    "rc": "RC",
+    "puc": "PUC",
+    "tax": "Tax",
+    "insurance": "Insurance",
+    "national_permit": "National Permit",
+    "state_permit": "State Permit",
+    "fitness": "Fitness",
+    "license_nt": "Driving License (Non-Transport)",
+    "license_tr": "Driving License (Transport)",
+}
+LICENSE_EXPIRY_FIELDS = {"license_nt": "validity_nt", "license_tr": "validity_tr"}
+# A claim that was never marked sent belongs to a run that died mid-send.
+STALE_CLAIM_AGE = timedelta(hours=1)
+
+def _as_datetime(value) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return None
+
+def truck_expiries(documents: dict) -> List[dict]:
+    expiries = []
+    for doc, key in TRUCK_DOC_EXPIRY_FIELDS.items():
+        expiry = _as_datetime((documents.get(doc) or {}).get(key))
+        if expiry:
+            expiries.append({"doc": doc, "date": expiry})
+    return expiries
+
+def driver_expiries(license: dict) -> List[dict]:
+    expiries = []
+    for doc, key in LICENSE_EXPIRY_FIELDS.items():
+        expiry = _as_datetime((license or {}).get(key))
+        if expiry:
+            expiries.append({"doc": doc, "date": expiry})
+    return expiries
+
+def due_threshold(days_left: int) -> Optional[int]:
+    """The tightest configured threshold a document has reached, e.g. 7 when 5 days are left."""
+    reached = [t for t in EXPIRY_REMINDER_DAYS if days_left <= t]
+    return min(reached) if reached else None
+
+def _reminder_id(kind: str, entity_id, doc: str, expiry: datetime, threshold: int) -> str:
+    return f"{kind}:{entity_id}:{doc}:{expiry:%Y%m%d}:{threshold}"
+
+def collect_due_items(today: datetime) -> Dict:
+    """
+    One range scan per collection over `document_expiries.date` for everything expiring
+    between the lookback and the widest threshold, grouped by company. Each item carries
+    the threshold it is due for and the id of its sent marker.
+    """
+    window = {"$gte": today - timedelta(days=EXPIRY_REMINDER_LOOKBACK_DAYS), "$lt": today + timedelta(days=max(EXPIRY_REMINDER_DAYS) + 1)}
+    sources = (
+        ("truck", db.trucks, {"truck_number": 1}, lambda r: r.get("truck_number")),
+        ("driver", db.drivers, {"first_name": 1, "last_name": 1}, lambda r: f"{r.get('first_name', '')} {r.get('last_name', '')}".strip()),
+    )
+    by_company = defaultdict(list)
+    for kind, collection, label_fields, label in sources:
+        cursor = collection.find(
+            {"document_expiries": {"$elemMatch": {"date": window}}},
+            {"company_id": 1, "document_expiries": 1, **label_fields}
+        ).batch_size(1000)
+        for resource in cursor:
+            for expiry in resource.get("document_expiries", []):
+                if not (window["$gte"] <= expiry["date"] < window["$lt"]):
+                    continue
+                days_left = (expiry["date"] - today).days
+                threshold = due_threshold(days_left)
+                if threshold is None:
+                    continue
+                by_company[resource["company_id"]].append({
+                    "_id": _reminder_id(kind, resource["_id"], expiry["doc"], expiry["date"], threshold),
+                    "label": label(resource),
+                    "document": DOC_LABELS.get(expiry["doc"], expiry["doc"]),
+                    "expiry_date": expiry["date"],
+                    "days_left": days_left,
+                })
+    return by_company
+
+def claim_items(by_company: Dict, now: datetime) -> Dict:
+    """
+    Inserts a sent marker per due item in one unordered bulk insert. Markers that
+    already exist (sent on an earlier run) fail on _id and drop their item, so only
+    new items remain; companies left with nothing are removed.
+    """
+    markers = [
+        {"_id": item["_id"], "company_id": company_id, "claimed_at": now, "sent_at": None}
+        for company_id, items in by_company.items() for item in items
+    ]
+    if not markers:
+        return {}
+    already_sent = set()
+    try:
+        db.expiry_reminders_sent.insert_many(markers, ordered=False)
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            if error.get("code") != 11000:
+                raise
+            already_sent.add(markers[error["index"]]["_id"])
+    claimed = {}
+    for company_id, items in by_company.items():
+        fresh = [item for item in items if item["_id"] not in already_sent]
+        if fresh:
+            claimed[company_id] = fresh
+    return claimed
+
+def _sms_body(items: List[dict]) -> str:
+    expired = sum(1 for item in items if item["days_left"] < 0)
+    soonest = min(items, key=lambda item: item["days_left"])
+    return (
+        f"FleetDocs: {len(items)} document(s) need renewal"
+        + (f", {expired} already expired" if expired else "")
+        + f". Earliest: {soonest['label']} {soonest['document']} on {soonest['expiry_date']:%d %b %Y}. Details sent by email."
+    )
+
+def _send_digest(company: dict, items: List[dict]) -> bool:
+    items = sorted(items, key=lambda item: (item["expiry_date"], item["label"] or ""))
+    sent = send_expiry_digest_email(company.get("email"), company.get("company_name"), items)
+    if sent and EXPIRY_REMINDER_SMS and company.get("primary_phone"):
+        phone = company["primary_phone"]
+        send_sms(phone if phone.startswith("+") else f"+91{phone}", _sms_body(items))
+    return sent
+
+def send_expiry_reminders() -> int:
+    """
+    Sends each company one digest of its documents that crossed a reminder threshold
+    (EXPIRY_REMINDER_DAYS days before expiry, and on expiry) since the last run.
+    Items are claimed in `expiry_reminders_sent` before sending, so a restart or a
+    second run the same day does not resend them; a failed send releases its claims
+    for the next run. Digests go out from a small thread pool. Returns the number of
+    companies notified.
+    """
+    now = datetime.utcnow()
+    today = datetime(now.year, now.month, now.day)
+    db.expiry_reminders_sent.delete_many({"sent_at": None, "claimed_at": {"$lt": now - STALE_CLAIM_AGE}})
+
+    claimed = claim_items(collect_due_items(today), now)
+    if not claimed:
+        logger.info("Expiry reminders: Nothing due.")
+        return 0
+
+    companies = {}
+    company_ids = list(claimed)
+    for start in range(0, len(company_ids), 1000):
+        for company in db.companies.find(
+            {"_id": {"$in": company_ids[start:start + 1000]}, "status": "active"},
+            {"email": 1, "company_name": 1, "primary_phone": 1}
+        ):
+            companies[company["_id"]] = company
+
+    def deliver(company_id):
+        company = companies.get(company_id)
+        if company is None:
+            # Inactive or deleted tenants are not reminded; their claims stand.
+            return company_id, True
+        try:
+            return company_id, _send_digest(company, claimed[company_id])
+        except Exception as e:
+            logger.error(f"Expiry reminders: Digest for company {company_id} failed: {e}")
+            return company_id, False
+
+    sent_ids, failed_ids, notified = [], [], 0
+    with ThreadPoolExecutor(max_workers=EXPIRY_REMINDER_WORKERS) as pool:
+        for company_id, ok in pool.map(deliver, company_ids):
+            marker_ids = [item["_id"] for item in claimed[company_id]]
+            if ok:
+                sent_ids.extend(marker_ids)
+                notified += company_id in companies
+            else:
+                failed_ids.extend(marker_ids)
+
+    sent_at = datetime.utcnow()
+    for start in range(0, len(sent_ids), 1000):
+        db.expiry_reminders_sent.update_many({"_id": {"$in": sent_ids[start:start + 1000]}}, {"$set": {"sent_at": sent_at}})
+    for start in range(0, len(failed_ids), 1000):
+        db.expiry_reminders_sent.delete_many({"_id": {"$in": failed_ids[start:start + 1000]}})
+    logger.info(f"Expiry reminders: Notified {notified} companies, {len(failed_ids)} item(s) left for retry.")
+    return notified
@@ -0,0 +1,93 @@
+# app/utils/history_utils.py
+
+import re
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, List, Optional
+from pymongo import DESCENDING, ASCENDING
+from pymongo.errors import BulkWriteError
+from app.database.database import db
+
+# Completed assignments live in one collection per month of their assignment_date, e.g.
+# assignments_history_202510. `assignments` only keeps active (hot) records plus history
+# that has not been moved yet, and retention drops whole months.
+HISTORY_PREFIX = "assignments_history_"
+PARTITION_PATTERN = re.compile(rf"^{HISTORY_PREFIX}\d{{6}}$")
+
+_indexed_partitions = set()
+
+def partition_name(assignment_date: datetime) -> str:
+    return f"{HISTORY_PREFIX}{assignment_date:%Y%m}"
+
+def partition_month(name: str) -> datetime:
+    """First instant of the month a partition covers."""
+    return datetime.strptime(name[len(HISTORY_PREFIX):], "%Y%m")
+
+def next_month(month: datetime) -> datetime:
+    return month.replace(year=month.year + month.month // 12, month=month.month % 12 + 1)
+
+def history_partitions() -> List[str]:
+    """Existing partitions, newest month first."""
+    return sorted((name for name in db.list_collection_names() if PARTITION_PATTERN.match(name)), reverse=True)
+
+def ensure_partition(name: str):
+    """Creates the listing and rollup indexes on a partition the first time this process writes to it."""
+    if name in _indexed_partitions:
+        return
+    db[name].create_index([("company_id", ASCENDING), ("assignment_date", DESCENDING), ("_id", DESCENDING)])
+    db[name].create_index([("updated_at", ASCENDING)])
+    _indexed_partitions.add(name)
+
+def move_to_history(docs: Iterable[dict]) -> int:
+    """
+    Moves history documents from `assignments` into their monthly partitions, keeping
+    their _id. Copies are inserted before the originals are deleted, and copies left by
+    an interrupted earlier move are ignored, so a move can always be retried.
+    """
+    by_partition = defaultdict(list)
+    for doc in docs:
+        by_partition[partition_name(doc["assignment_date"])].append(doc)
+    moved_ids = []
+    for name, partition_docs in by_partition.items():
+        ensure_partition(name)
+        try:
+            db[name].insert_many(partition_docs, ordered=False)
+        except BulkWriteError as e:
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+        moved_ids.extend(doc["_id"] for doc in partition_docs)
+    if moved_ids:
+        db.assignments.delete_many({"_id": {"$in": moved_ids}, "status": "history"})
+    return len(moved_ids)
+
+def move_history_batch(limit: int, query: Optional[dict] = None) -> int:
+    """Moves up to `limit` history documents (matching `query`) still sitting in `assignments`."""
+    return move_to_history(db.assignments.find({**(query or {}), "status": "history"}).limit(limit))
+
+def expired_partitions(cutoff: datetime) -> List[str]:
+    """Partitions whose whole month ended before `cutoff`."""
+    expired = []
+    for name in history_partitions():
+        if next_month(partition_month(name)) <= cutoff:
+            expired.append(name)
+    return expired
+
+def drop_partition(name: str) -> List:
+    """Drops a partition and returns the companies that had records in it."""
+    affected_companies = db[name].distinct("company_id")
+    db[name].drop()
+    _indexed_partitions.discard(name)
+    return affected_companies
+
+def union_stages(partitions: Iterable[str], company_id, match_filter: Optional[dict], stages: Optional[list] = None) -> List[dict]:
+    """
+    $unionWith stages that append the company's documents from each partition. Each
+    branch filters on (and optionally sorts/limits by) the partition index on its own.
+    """
+    return [
+        {"$unionWith": {
+            "coll": name,
+            "pipeline": [{"$match": {"company_id": company_id, **(match_filter or {})}}, *(stages or [])]
+        }}
+        for name in partitions
+    ]
@@ -0,0 +1,80 @@
+# app/utils/identity_utils.py
+
+import logging
+from typing import Optional, Tuple
+from pymongo.errors import DuplicateKeyError
+from app.config import IDENTITY_LEGACY_LOOKUP
+from app.database.database import db
+
+logger = logging.getLogger(__name__)
+
+# Login identifiers (usernames and emails of admins and companies) are indexed in the
+# `identities` collection, one entry per normalized identifier:
+#     {_id: "<identifier>", role: "admin" | "company", owner_id: ObjectId}
+# so a login resolves its principal with one _id lookup instead of an unindexed $or
+# scan over both collections. Entries are kept in step by sync_identities() wherever
+# credentials or emails change; accounts written before this existed are indexed by
+# scripts/backfill_identities.py. Only while IDENTITY_LEGACY_LOOKUP is on (between
+# deploying and running the backfill) do unknown identifiers fall back to the old scans.
+
+COLLECTIONS = {"admin": "admins", "company": "companies"}
+
+def normalize_identifier(identifier: Optional[str]) -> str:
+    return (identifier or "").strip().lower()
+
+def _identifiers(doc: dict) -> set:
+    return {normalize_identifier(doc.get(field)) for field in ("username", "email")} - {""}
+
+def sync_identities(role: str, doc: dict):
+    """Points every username/email of `doc` at it and drops identifiers it no longer has."""
+    idents = _identifiers(doc)
+    for ident in idents:
+        try:
+            db.identities.insert_one({"_id": ident, "role": role, "owner_id": doc["_id"]})
+        except DuplicateKeyError:
+            existing = db.identities.find_one({"_id": ident})
+            if not existing or (existing["role"] == role and existing["owner_id"] == doc["_id"]):
+                continue
+            if _owner(existing) is None:
+                # Stale entry left by an account that changed or lost this identifier
+                db.identities.replace_one(existing, {"_id": ident, "role": role, "owner_id": doc["_id"]})
+            else:
+                logger.warning(f"Identity {ident!r} of {role} {doc['_id']} is already used by {existing['role']} {existing['owner_id']}")
+    db.identities.delete_many({"role": role, "owner_id": doc["_id"], "_id": {"$nin": list(idents)}})
+
+def remove_identities(role: str, owner_id):
+    db.identities.delete_many({"role": role, "owner_id": owner_id})
+
+def _owner(entry: dict) -> Optional[dict]:
+    """The document an entry points at, if it still carries the entry's identifier."""
+    doc = db[COLLECTIONS[entry["role"]]].find_one({"_id": entry["owner_id"]})
+    if doc is None or entry["_id"] not in _identifiers(doc):
+        return None
+    return doc
+
+def resolve_principal(identifier: str) -> Tuple[Optional[str], Optional[dict]]:
+    """
+    Finds the admin or company a username/email belongs to and returns (role, document),
+    or (None, None).
+    """
+    ident = normalize_identifier(identifier)
+    if not ident:
+        return None, None
+    entry = db.identities.find_one({"_id": ident})
+    if entry is not None:
+        doc = _owner(entry)
+        if doc is not None:
+            return entry["role"], doc
+        db.identities.delete_one(entry)
+    if not IDENTITY_LEGACY_LOOKUP:
+        return None, None
+
+    # Not indexed yet: fall back to the legacy lookups (admins first) and index what
+    # they find.
+    raw = identifier.strip()
+    for role, collection in COLLECTIONS.items():
+        doc = db[collection].find_one({"$or": [{"username": raw}, {"email": raw}]})
+        if doc is not None:
+            sync_identities(role, doc)
+            return role, doc
+    return None, None
@@ -1,8 +1,13 @@
 import jwt
 import os
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 from fastapi import HTTPException, status
+from app.utils.metrics_utils import register_metrics
 
 load_dotenv()
 
@@ -10,6 +15,7 @@ JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 JWT_REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("JWT_REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+JWT_CACHE_MAX_ENTRIES = int(os.getenv("JWT_CACHE_MAX_ENTRIES", "10000"))
 
 
 def create_access_token(data: dict, expires_delta: int = JWT_ACCESS_TOKEN_EXPIRE_MINUTES, token_type="access"):
@@ -28,9 +34,71 @@ def create_refresh_token(data: dict, expires_delta: int = JWT_REFRESH_TOKEN_EXPI
     return encoded_jwt
 
 
+class VerifiedTokenCache:
+    """
+    Bounded LRU of verified token claims, keyed by the SHA-256 of the token and kept
+    until the token's own exp. Clients resend the same bearer token on every request,
+    so the signature check and claim validation run once per token instead.
+    """
+
+    def __init__(self, max_entries: int = JWT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        register_metrics("jwt_cache", self.stats)
+
+    def decode(self, token: str) -> dict:
+        """jwt.decode with our key and algorithm, raising the same errors."""
+        key = hashlib.sha256(token.encode()).digest()
+        with self._lock:
+            claims = self._entries.get(key)
+            if claims is not None:
+                if claims["exp"] > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(claims)
+                del self._entries[key]
+            self.misses += 1
+        claims = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+        if isinstance(claims.get("exp"), (int, float)) and self.max_entries > 0:
+            with self._lock:
+                self._entries[key] = claims
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return dict(claims)
+
+    def invalidate_subject(self, sub: str):
+        """Drops every cached token issued to `sub`, e.g. when its session is rotated."""
+        with self._lock:
+            for key in [k for k, claims in self._entries.items() if claims.get("sub") == sub]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+token_cache = VerifiedTokenCache()
+
+def decode_token(token: str) -> dict:
+    return token_cache.decode(token)
+
+
 def verify_access_token(token: str):
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+        payload = decode_token(token)
         if payload.get("type") != "access":
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token type")
         return payload
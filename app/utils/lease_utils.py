@@ -0,0 +1,100 @@
+# app/utils/lease_utils.py
+
+import logging
+import os
+import socket
+import threading
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Optional
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.database.database import db
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process as a lease holder; unique per worker even on one host.
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+class LeaseLost(Exception):
+    """Raised by ensure_lease() once another instance has taken over the running job's lease."""
+
+# Set while a job runs under hold_lease(); the event is set when the lease is lost.
+_lost_event: ContextVar[Optional[threading.Event]] = ContextVar("lease_lost", default=None)
+
+def acquire_lease(name: str, ttl_seconds: int) -> bool:
+    """
+    Takes or renews the lease `name` for `ttl_seconds`. Succeeds when nobody holds it,
+    the previous holder's lease has expired (it died or stalled), or this instance
+    already holds it. The upsert's unique _id makes concurrent takeovers race-free.
+    """
+    now = datetime.utcnow()
+    try:
+        lease = db.scheduler_leases.find_one_and_update(
+            {"_id": name, "$or": [{"expires_at": {"$lte": now}}, {"holder": INSTANCE_ID}]},
+            {"$set": {"holder": INSTANCE_ID, "acquired_at": now, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        return False
+    return lease is not None and lease["holder"] == INSTANCE_ID
+
+def renew_lease(name: str, ttl_seconds: int) -> bool:
+    """Extends a lease this instance holds. False if it is no longer ours."""
+    result = db.scheduler_leases.update_one(
+        {"_id": name, "holder": INSTANCE_ID},
+        {"$set": {"expires_at": datetime.utcnow() + timedelta(seconds=ttl_seconds)}}
+    )
+    return result.matched_count == 1
+
+@contextmanager
+def hold_lease(name: str, ttl_seconds: int):
+    """
+    Keeps an acquired lease alive while the body runs: a heartbeat thread renews it
+    every third of its TTL, so a run longer than the TTL is not taken over. If a
+    renewal finds the lease gone, the body's next ensure_lease() raises LeaseLost.
+    """
+    lost, done = threading.Event(), threading.Event()
+
+    def beat():
+        while not done.wait(max(ttl_seconds / 3, 1)):
+            try:
+                if not renew_lease(name, ttl_seconds):
+                    logger.warning(f"Lease {name} was taken over while its job was running.")
+                    lost.set()
+                    return
+            except Exception as e:
+                # A failed renewal is retried on the next beat; the lease is still ours.
+                logger.error(f"Failed to renew lease {name}: {e}")
+
+    heartbeat = threading.Thread(target=beat, name=f"lease-{name}", daemon=True)
+    heartbeat.start()
+    token = _lost_event.set(lost)
+    try:
+        yield
+    finally:
+        _lost_event.reset(token)
+        done.set()
+        heartbeat.join()
+
+def ensure_lease():
+    """Long-running jobs call this between batches; stops them once their lease is lost."""
+    lost = _lost_event.get()
+    if lost is not None and lost.is_set():
+        raise LeaseLost()
+
+def record_run(name: str, started_at: datetime, duration_ms: int, status: str, error: str = None):
+    """Stores the outcome of a job run on its lease document."""
+    db.scheduler_leases.update_one(
+        {"_id": name},
+        {"$set": {
+            "last_run_at": started_at,
+            "last_duration_ms": duration_ms,
+            "last_status": status,
+            "last_error": error,
+            "last_run_by": INSTANCE_ID
+        }}
+    )
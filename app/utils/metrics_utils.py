@@ -0,0 +1,25 @@
+# app/utils/metrics_utils.py
+
+import logging
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+_providers: Dict[str, Callable[[], dict]] = {}
+
+def register_metrics(name: str, provider: Callable[[], dict]):
+    """
+    Registers a callable that returns a snapshot of a component's counters.
+    Snapshots are gathered on demand by collect_metrics().
+    """
+    _providers[name] = provider
+
+def collect_metrics() -> dict:
+    snapshot = {}
+    for name, provider in _providers.items():
+        try:
+            snapshot[name] = provider()
+        except Exception as e:
+            logger.error(f"Failed to collect metrics for {name}: {e}")
+            snapshot[name] = {"error": str(e)}
+    return snapshot
@@ -0,0 +1,106 @@
+# app/utils/notification_utils.py
+
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.config import NOTIFY_WINDOW_SECONDS, NOTIFY_MAX_CHANGES
+from app.database.database import db
+from app.utils.lease_utils import ensure_lease
+from app.utils.email_utils import send_truck_updated_email, send_driver_updated_email
+
+logger = logging.getLogger(__name__)
+
+# Update notifications for a truck or driver are buffered in `pending_notifications`,
+# one open window per (company, kind, entity). The first change opens the window and
+# sets flush_at to NOTIFY_WINDOW_SECONDS later; further changes are appended to it. The
+# flusher sends one merged email per window once flush_at has passed, or as soon as it
+# can once NOTIFY_MAX_CHANGES changes have piled up.
+
+def record_change(company: dict, kind: str, entity_id, change: dict):
+    """Adds a change event for a truck or driver to the company's open window for it."""
+    company_data = company.get("company_data", {})
+    now = datetime.utcnow()
+    key = {"company_id": ObjectId(company["company_id"]), "kind": kind, "entity_id": ObjectId(entity_id), "status": "open"}
+    update = {
+        "$push": {"changes": {**change, "at": now}},
+        "$inc": {"count": 1},
+        "$set": {"to_email": company_data.get("email"), "company_name": company_data.get("company_name")},
+        "$setOnInsert": {"first_at": now, "flush_at": now + timedelta(seconds=NOTIFY_WINDOW_SECONDS)}
+    }
+    try:
+        window = db.pending_notifications.find_one_and_update(key, update, upsert=True, return_document=ReturnDocument.AFTER)
+    except DuplicateKeyError:
+        # Another request opened the window first; append to it.
+        window = db.pending_notifications.find_one_and_update(key, update, upsert=True, return_document=ReturnDocument.AFTER)
+    if window["count"] >= NOTIFY_MAX_CHANGES:
+        db.pending_notifications.update_one(
+            {"_id": window["_id"], "status": "open"},
+            {"$set": {"status": "due", "flush_at": now}}
+        )
+
+def _send_window(window: dict) -> bool:
+    """
+    Sends the merged email for a window. Returns False if the entity no longer exists.
+
+    Merged truck emails carry download links, not attachments: by the time a window is
+    flushed the uploads are gone, so attaching would download every changed document
+    from S3 again on the flusher, for a burst of changes in one email. Links are only
+    signed locally and cost no S3 reads.
+    """
+    scope = {"_id": window["entity_id"], "company_id": window["company_id"]}
+    if window["kind"] == "truck":
+        truck = db.trucks.find_one(scope)
+        if not truck:
+            return False
+        latest_urls = {}
+        for change in window["changes"]:
+            latest_urls.pop(change["doc_type"], None)
+            latest_urls[change["doc_type"]] = change.get("url")
+        send_truck_updated_email(
+            to_email=window["to_email"],
+            company_name=window["company_name"],
+            truck=truck,
+            new_doc_urls=latest_urls,
+            attachment_budget=0
+        )
+        return True
+
+    driver = db.drivers.find_one(scope)
+    if not driver:
+        return False
+    update_types = list(dict.fromkeys(change["update_type"] for change in window["changes"]))
+    send_driver_updated_email(
+        to_email=window["to_email"],
+        company_name=window["company_name"],
+        driver=driver,
+        update_type=" and ".join(update_types)
+    )
+    return True
+
+def flush_pending_notifications(limit: Optional[int] = 1000) -> int:
+    """
+    Sends every window that is due. Each window is removed atomically before its email
+    is built, so a change arriving meanwhile opens a fresh window instead of being lost.
+    Returns the number of emails queued.
+    """
+    sent = 0
+    for _ in range(limit):
+        ensure_lease()
+        window = db.pending_notifications.find_one_and_delete(
+            {"flush_at": {"$lte": datetime.utcnow()}}, sort=[("flush_at", 1)]
+        )
+        if window is None:
+            break
+        try:
+            sent += _send_window(window)
+        except Exception as e:
+            logger.error(f"Notifications: Failed to send {window['kind']} update for {window['entity_id']}: {e}")
+            window["status"] = "due"
+            db.pending_notifications.insert_one(window)
+            break
+    if sent:
+        logger.info(f"Notifications: Queued {sent} merged update email(s).")
+    return sent
@@ -1,27 +1,239 @@
 # app/utils/otp_utils.py
+import asyncio
+import hashlib
+import hmac
+import logging
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Dict, Tuple
+import requests
+from fastapi import HTTPException, status
 from twilio.rest import Client
-import os
-from dotenv import load_dotenv
+from twilio.http.http_client import TwilioHttpClient
+from twilio.base.exceptions import TwilioRestException
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.config import (
+    TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_VERIFY_SID, TWILIO_SMS_FROM,
+    OTP_PROVIDER, OTP_TIMEOUT_SECONDS, OTP_RETRIES, OTP_MEMORY_CODE, OTP_MEMORY_LATENCY_MS,
+    OTP_SECRET, OTP_LENGTH, OTP_TTL_SECONDS, OTP_MAX_ATTEMPTS, OTP_RESEND_WINDOW_SECONDS
+)
+from app.database.database import db
+from app.utils.metrics_utils import register_metrics
 
+logger = logging.getLogger(__name__)
 
-load_dotenv()
+# The HTTP client timeout bounds each Twilio request; the blocking SDK calls themselves
+# run in a worker thread so a slow Twilio never stalls the event loop.
+client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, http_client=TwilioHttpClient(timeout=OTP_TIMEOUT_SECONDS))
 
-TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
-TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
-TWILIO_VERIFY_SID = os.getenv("TWILIO_VERIFY_SID")
+class OTPProvider(ABC):
+    """Sends one-time codes to a phone number and checks them."""
 
-client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+    @abstractmethod
+    async def send(self, phone: str) -> str:
+        """Returns the delivery status ("pending" or "sent" on success)."""
 
-def send_otp(phone: str):
-    verification = client.verify.v2.services(TWILIO_VERIFY_SID).verifications.create(
-        to = phone,
-        channel = "sms"
-    )
-    return verification.status
+    @abstractmethod
+    async def verify(self, phone: str, code: str) -> bool:
+        """True if `code` is the valid code last sent to `phone`."""
 
-def verify_otp(phone: str, code: str):
-    check = client.verify.v2.services(TWILIO_VERIFY_SID).verification_checks.create(
-        to = phone,
-        code = code
-    )
-    return check.status == "approved"
+def _transient(e: Exception) -> bool:
+    if isinstance(e, TwilioRestException):
+        return e.status == 429 or e.status >= 500
+    # requests' connection errors and timeouts are OSErrors
+    return isinstance(e, (asyncio.TimeoutError, OSError))
+
+async def _call(func, *, retry_on_timeout: bool):
+    """Runs a blocking Twilio call off the loop with a deadline, retrying transient failures."""
+    for attempt in range(OTP_RETRIES + 1):
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(func), timeout=OTP_TIMEOUT_SECONDS)
+        except Exception as e:
+            timed_out = isinstance(e, (asyncio.TimeoutError, requests.Timeout))
+            if not _transient(e) or (timed_out and not retry_on_timeout) or attempt == OTP_RETRIES:
+                logger.error(f"OTP: Twilio call failed after {attempt + 1} attempt(s): {e}")
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="OTP service is unavailable, please try again.")
+            await asyncio.sleep(0.2 * 2 ** attempt)
+
+class TwilioVerifyProvider(OTPProvider):
+    async def send(self, phone: str) -> str:
+        verification = await _call(
+            lambda: client.verify.v2.services(TWILIO_VERIFY_SID).verifications.create(to=phone, channel="sms"),
+            retry_on_timeout=True
+        )
+        return verification.status
+
+    async def verify(self, phone: str, code: str) -> bool:
+        # A check that timed out may still have been counted by Twilio, so only retry
+        # failures that certainly did not reach it.
+        check = await _call(
+            lambda: client.verify.v2.services(TWILIO_VERIFY_SID).verification_checks.create(to=phone, code=code),
+            retry_on_timeout=False
+        )
+        return check.status == "approved"
+
+class LocalOTPProvider(OTPProvider):
+    """
+    Issues codes itself and uses Twilio only to deliver the SMS. A code is the HMAC of a
+    random nonce, truncated to OTP_LENGTH digits; `otp_codes` keeps only a keyed hash of
+    it, one document per phone (_id), removed by a TTL index once it expires. A check is
+    a single _id read-and-increment, refused after OTP_MAX_ATTEMPTS wrong codes, and a
+    code that matches is deleted so it cannot be used twice.
+    """
+
+    def _new_code(self) -> str:
+        digest = hmac.new(OTP_SECRET.encode(), secrets.token_bytes(16), hashlib.sha256).digest()
+        offset = digest[-1] & 0x0F
+        value = int.from_bytes(digest[offset:offset + 4], "big") & 0x7FFFFFFF
+        return str(value % 10 ** OTP_LENGTH).zfill(OTP_LENGTH)
+
+    def _hash(self, phone: str, code: str) -> str:
+        return hmac.new(OTP_SECRET.encode(), f"{phone}:{code}".encode(), hashlib.sha256).hexdigest()
+
+    async def send(self, phone: str) -> str:
+        if not TWILIO_SMS_FROM:
+            logger.error("OTP: TWILIO_SMS_FROM is not configured; cannot deliver local OTPs.")
+            return "failed"
+        code = self._new_code()
+        now = datetime.utcnow()
+        db.otp_codes.replace_one(
+            {"_id": phone},
+            {"code_hash": self._hash(phone, code), "attempts": 0, "created_at": now,
+             "expires_at": now + timedelta(seconds=OTP_TTL_SECONDS)},
+            upsert=True
+        )
+        body = f"Your FleetDocs verification code is {code}. It expires in {OTP_TTL_SECONDS // 60} minutes."
+        await _call(lambda: client.messages.create(to=phone, from_=TWILIO_SMS_FROM, body=body), retry_on_timeout=False)
+        return "sent"
+
+    async def verify(self, phone: str, code: str) -> bool:
+        entry = db.otp_codes.find_one_and_update(
+            {"_id": phone, "expires_at": {"$gt": datetime.utcnow()}, "attempts": {"$lt": OTP_MAX_ATTEMPTS}},
+            {"$inc": {"attempts": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if entry is None or not hmac.compare_digest(entry["code_hash"], self._hash(phone, code or "")):
+            return False
+        # Only the request that removes the code gets to use it.
+        return db.otp_codes.delete_one({"_id": phone, "code_hash": entry["code_hash"]}).deleted_count == 1
+
+class InMemoryOTPProvider(OTPProvider):
+    """
+    Keeps codes in process memory and sends nothing, for tests and offline load tests.
+    Every code is OTP_MEMORY_CODE when set (random otherwise, see last_code()), and each
+    call waits OTP_MEMORY_LATENCY_MS to stand in for the network round trip.
+    """
+
+    def __init__(self, code: str = OTP_MEMORY_CODE, latency_ms: float = OTP_MEMORY_LATENCY_MS, ttl_seconds: int = 600):
+        self.code = code
+        self.latency = latency_ms / 1000
+        self.ttl = ttl_seconds
+        self._codes: Dict[str, Tuple[str, float]] = {}
+
+    def last_code(self, phone: str):
+        entry = self._codes.get(phone)
+        return entry[0] if entry else None
+
+    async def send(self, phone: str) -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        code = self.code or f"{secrets.randbelow(10 ** 6):06d}"
+        self._codes[phone] = (code, time.monotonic() + self.ttl)
+        return "pending"
+
+    async def verify(self, phone: str, code: str) -> bool:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        entry = self._codes.get(phone)
+        if not entry or entry[1] < time.monotonic() or not secrets.compare_digest(entry[0], code or ""):
+            return False
+        del self._codes[phone]
+        return True
+
+PROVIDERS = {"twilio": TwilioVerifyProvider, "local": LocalOTPProvider, "memory": InMemoryOTPProvider}
+
+def _make_provider(name: str) -> OTPProvider:
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown OTP_PROVIDER {name!r}; expected one of {', '.join(PROVIDERS)}")
+    return PROVIDERS[name]()
+
+provider: OTPProvider = _make_provider(OTP_PROVIDER)
+
+def set_otp_provider(new_provider: OTPProvider):
+    """Swaps the provider used by send_otp/verify_otp (for tests and benchmarks)."""
+    global provider
+    provider = new_provider
+
+# Repeated requests for the same phone (double taps, app retries) share one SMS. Calls
+# that overlap in this process wait for the send already in flight; across processes,
+# `otp_sends` records the last send per phone and a new one is only made once
+# OTP_RESEND_WINDOW_SECONDS have passed. Either way the caller gets ALREADY_SENT and the
+# user should enter the code already on its way.
+ALREADY_SENT = "already_sent"
+SENT_STATUSES = ("pending", "sent", ALREADY_SENT)
+
+_in_flight: Dict[str, asyncio.Future] = {}
+_stats_lock = threading.Lock()
+_stats = {"sent": 0, "coalesced": 0, "suppressed": 0, "failed": 0}
+
+def _count(key: str):
+    with _stats_lock:
+        _stats[key] += 1
+
+async def _send_once(phone: str) -> str:
+    now = datetime.utcnow()
+    claim = secrets.token_hex(8)
+    try:
+        db.otp_sends.update_one(
+            {"_id": phone, "sent_at": {"$lte": now - timedelta(seconds=OTP_RESEND_WINDOW_SECONDS)}},
+            {"$set": {"sent_at": now, "claim": claim}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # Sent within the window (the filter did not match, so the upsert collided)
+        _count("suppressed")
+        return ALREADY_SENT
+    try:
+        send_status = await provider.send(phone)
+    except BaseException:
+        send_status = None
+        raise
+    finally:
+        if send_status not in ("pending", "sent"):
+            # Let the next request try again rather than wait out the window
+            _count("failed")
+            db.otp_sends.delete_one({"_id": phone, "claim": claim})
+        else:
+            _count("sent")
+    return send_status
+
+async def send_otp(phone: str) -> str:
+    """Sends a code to `phone`, or returns ALREADY_SENT if one was just sent there."""
+    task = _in_flight.get(phone)
+    if task is not None:
+        _count("coalesced")
+        send_status = await asyncio.shield(task)
+        # Only report a code as already sent if the shared send actually sent one
+        return ALREADY_SENT if send_status in ("pending", "sent") else send_status
+    task = asyncio.ensure_future(_send_once(phone))
+    _in_flight[phone] = task
+    task.add_done_callback(lambda t: _in_flight.pop(phone, None) if _in_flight.get(phone) is t else None)
+    return await asyncio.shield(task)
+
+async def verify_otp(phone: str, code: str) -> bool:
+    verified = await provider.verify(phone, code)
+    if verified:
+        # The code is used up; the next login may send a new one straight away.
+        db.otp_sends.delete_one({"_id": phone})
+    return verified
+
+def otp_metrics() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    return {**stats, "in_flight": len(_in_flight), "provider": type(provider).__name__}
+
+register_metrics("otp", otp_metrics)
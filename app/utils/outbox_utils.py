@@ -0,0 +1,198 @@
+# app/utils/outbox_utils.py
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import List, Optional
+import requests
+from pymongo import ReturnDocument
+from requests.adapters import HTTPAdapter
+from app.config import (
+    SENDGRID_API_KEY, EMAIL_WORKERS, EMAIL_MAX_ATTEMPTS, EMAIL_RETRY_BASE_SECONDS,
+    EMAIL_SEND_TIMEOUT_SECONDS, EMAIL_OUTBOX_POLL_SECONDS
+)
+from app.database.database import db
+from app.utils.metrics_utils import register_metrics
+
+logger = logging.getLogger(__name__)
+
+SENDGRID_SEND_URL = "https://api.sendgrid.com/v3/mail/send"
+# A message stuck in 'sending' longer than this belongs to a worker that died.
+SEND_LEASE = timedelta(minutes=5)
+MAX_RETRY_DELAY_SECONDS = 6 * 3600
+
+# Emails are written to `email_outbox` by the request that triggers them and sent by a
+# pool of worker threads. Each message moves pending -> sending -> sent, or back to
+# pending with a later next_attempt_at after a failure, and to dead once it has used
+# up EMAIL_MAX_ATTEMPTS or SendGrid rejects it outright.
+
+class PermanentSendError(Exception):
+    """SendGrid rejected the message itself; retrying cannot help."""
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_wakeup = threading.Event()
+_stop = threading.Event()
+_workers: List[threading.Thread] = []
+_stats_lock = threading.Lock()
+_stats = {"enqueued": 0, "sent": 0, "retried": 0, "dead_lettered": 0}
+_sent_times = deque(maxlen=10000)
+
+def _count(key: str):
+    with _stats_lock:
+        _stats[key] += 1
+        if key == "sent":
+            _sent_times.append(time.monotonic())
+
+def sendgrid_session() -> requests.Session:
+    """One keep-alive HTTP session shared by all workers, with a connection per worker."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=max(EMAIL_WORKERS, 1)))
+            session.headers.update({"Authorization": f"Bearer {SENDGRID_API_KEY}", "Content-Type": "application/json"})
+            _session = session
+        return _session
+
+def enqueue_email(message, kind: str):
+    """
+    Persists a SendGrid `Mail` message for the workers and returns its outbox id
+    without contacting SendGrid.
+    """
+    payload = message.get()
+    now = datetime.utcnow()
+    result = db.email_outbox.insert_one({
+        "kind": kind,
+        "to": [to.get("email") for p in payload.get("personalizations", []) for to in p.get("to", [])],
+        "subject": payload.get("subject"),
+        "payload": payload,
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now,
+        "created_at": now,
+        "sent_at": None,
+        "last_error": None
+    })
+    _count("enqueued")
+    _wakeup.set()
+    return result.inserted_id
+
+def _claim_next() -> Optional[dict]:
+    now = datetime.utcnow()
+    return db.email_outbox.find_one_and_update(
+        {"$or": [
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            {"status": "sending", "locked_until": {"$lt": now}}
+        ]},
+        {"$set": {"status": "sending", "locked_until": now + SEND_LEASE}},
+        sort=[("next_attempt_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+class _RetryAfter(Exception):
+    def __init__(self, seconds: float, status_code: int):
+        super().__init__(f"SendGrid returned {status_code}, retry after {seconds}s")
+        self.seconds = seconds
+
+def _post(payload: dict):
+    """Sends one message, raising on any failure."""
+    response = sendgrid_session().post(SENDGRID_SEND_URL, json=payload, timeout=EMAIL_SEND_TIMEOUT_SECONDS)
+    if response.status_code < 300:
+        return
+    if response.status_code == 429 or response.status_code >= 500:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            raise _RetryAfter(float(retry_after), response.status_code)
+        raise requests.HTTPError(f"SendGrid returned {response.status_code}", response=response)
+    raise PermanentSendError(f"SendGrid returned {response.status_code}: {response.text[:500]}")
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter: base, 2x base, 4x base, ... capped at six hours."""
+    delay = min(EMAIL_RETRY_BASE_SECONDS * (2 ** (attempts - 1)), MAX_RETRY_DELAY_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+def deliver(message: dict):
+    """Sends a claimed outbox message and records the outcome on it."""
+    attempts = message["attempts"] + 1
+    try:
+        _post(message["payload"])
+    except Exception as e:
+        permanent = isinstance(e, PermanentSendError) or attempts >= EMAIL_MAX_ATTEMPTS
+        update = {"attempts": attempts, "last_error": str(e), "locked_until": None}
+        if permanent:
+            update["status"] = "dead"
+            _count("dead_lettered")
+            logger.error(f"Outbox: Giving up on {message['kind']} email {message['_id']} after {attempts} attempt(s): {e}")
+        else:
+            delay = e.seconds if isinstance(e, _RetryAfter) else retry_delay(attempts)
+            update.update({"status": "pending", "next_attempt_at": datetime.utcnow() + timedelta(seconds=delay)})
+            _count("retried")
+            logger.warning(f"Outbox: {message['kind']} email {message['_id']} failed ({e}); retrying in {int(delay)}s.")
+        db.email_outbox.update_one({"_id": message["_id"]}, {"$set": update})
+        return
+    db.email_outbox.update_one(
+        {"_id": message["_id"]},
+        {"$set": {"status": "sent", "sent_at": datetime.utcnow(), "attempts": attempts, "locked_until": None},
+         "$unset": {"payload": ""}}
+    )
+    _count("sent")
+    logger.info(f"Outbox: {message['kind']} email sent to {', '.join(message.get('to') or [])}")
+
+def _worker_loop():
+    while not _stop.is_set():
+        try:
+            message = _claim_next()
+        except Exception as e:
+            logger.error(f"Outbox: Failed to claim a message: {e}")
+            message = None
+        if message is None:
+            _wakeup.wait(EMAIL_OUTBOX_POLL_SECONDS)
+            _wakeup.clear()
+            continue
+        try:
+            deliver(message)
+        except Exception:
+            logger.exception(f"Outbox: Failed to record the outcome of email {message['_id']}.")
+
+def start_email_workers():
+    """Starts the sender threads; safe to call once per process."""
+    if _workers or not SENDGRID_API_KEY:
+        if not SENDGRID_API_KEY:
+            logger.error("SendGrid credentials are not configured; outbox workers not started.")
+        return
+    _stop.clear()
+    for i in range(EMAIL_WORKERS):
+        thread = threading.Thread(target=_worker_loop, name=f"email-outbox-{i}", daemon=True)
+        thread.start()
+        _workers.append(thread)
+
+def stop_email_workers(timeout: float = 5.0):
+    _stop.set()
+    _wakeup.set()
+    for thread in _workers:
+        thread.join(timeout)
+    _workers.clear()
+
+def outbox_metrics() -> dict:
+    cutoff = time.monotonic() - 60
+    with _stats_lock:
+        counters = dict(_stats)
+        sent_last_minute = sum(1 for t in _sent_times if t >= cutoff)
+    depth = {row["_id"]: row["count"] for row in db.email_outbox.aggregate([
+        {"$match": {"status": {"$in": ["pending", "sending", "dead"]}}},
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+    ])}
+    return {
+        **counters,
+        "sent_last_minute": sent_last_minute,
+        "pending": depth.get("pending", 0),
+        "sending": depth.get("sending", 0),
+        "dead": depth.get("dead", 0),
+        "workers": sum(1 for thread in _workers if thread.is_alive())
+    }
+
+register_metrics("email_outbox", outbox_metrics)
@@ -0,0 +1,106 @@
+# app/utils/pagination_utils.py
+
+import base64
+from typing import Any, List, Optional, Tuple
+from bson import json_util
+from fastapi import HTTPException, status
+
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 200
+
+def encode_cursor(sort_value: Any, doc_id: Any) -> str:
+    """
+    Packs the (sort_key, _id) pair of the last returned document into an opaque,
+    URL-safe cursor string.
+    """
+    raw = json_util.dumps([sort_value, doc_id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[Any, Any]:
+    """
+    Unpacks a cursor produced by encode_cursor back into its (sort_value, _id) pair.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, doc_id = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor.")
+    return sort_value, doc_id
+
+def sort_spec(sort_key: str, direction: int = 1) -> List[Tuple[str, int]]:
+    """
+    Sort order matching keyset_filter. `_id` is always the tie-breaker so the order is total.
+    """
+    if sort_key == "_id":
+        return [("_id", direction)]
+    return [(sort_key, direction), ("_id", direction)]
+
+def keyset_filter(sort_key: str, cursor: Optional[str], direction: int = 1) -> dict:
+    """
+    Builds the filter that selects the documents strictly after the cursor position.
+    Used together with a compound index on (..., sort_key, _id) this makes every page
+    an index seek instead of a skip over all previous pages.
+    """
+    if not cursor:
+        return {}
+    sort_value, doc_id = decode_cursor(cursor)
+    op = "$gt" if direction == 1 else "$lt"
+    if sort_key == "_id":
+        return {"_id": {op: doc_id}}
+    # Documents without the sort key (or with null) sort before every value: first when
+    # ascending, last when descending. Range operators never match null, so those
+    # documents get their own branch.
+    if sort_value is None:
+        after = [{sort_key: None, "_id": {op: doc_id}}]
+        if direction == 1:
+            after.append({sort_key: {"$ne": None}})
+        return {"$or": after}
+    after = [
+        {sort_key: {op: sort_value}},
+        {sort_key: sort_value, "_id": {op: doc_id}}
+    ]
+    if direction == -1:
+        after.append({sort_key: None})
+    return {"$or": after}
+
+def merge_filters(query: dict, extra: dict) -> dict:
+    """
+    Combines two Mongo filters without letting top-level operators such as $or collide.
+    """
+    if not extra:
+        return query
+    if not query:
+        return extra
+    return {"$and": [query, extra]}
+
+def split_page(docs: list, sort_key: str, limit: int) -> Tuple[list, Optional[str]]:
+    """
+    Takes the `limit + 1` documents fetched for a page and returns the page itself
+    together with the cursor for the next one (None on the last page). A document
+    without the sort key gets a cursor with a null sort value.
+    """
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    last = docs[-1]
+    return docs, encode_cursor(last.get(sort_key), last["_id"])
+
+def paginate_find(
+    collection,
+    query: dict,
+    sort_key: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    direction: int = 1,
+    projection: Optional[dict] = None
+) -> Tuple[list, Optional[str]]:
+    """
+    Runs a keyset-paginated find() and returns (documents, next_cursor).
+    """
+    page_filter = merge_filters(query, keyset_filter(sort_key, cursor, direction))
+    docs = list(
+        collection.find(page_filter, projection)
+        .sort(sort_spec(sort_key, direction))
+        .limit(limit + 1)
+    )
+    return split_page(docs, sort_key, limit)
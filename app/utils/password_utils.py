@@ -0,0 +1,121 @@
+# app/utils/password_utils.py
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, status
+import bcrypt
+from app.config import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
+from app.utils.metrics_utils import register_metrics
+
+logger = logging.getLogger(__name__)
+
+# bcrypt costs a few hundred milliseconds of CPU per call, so hashing and checking never
+# run on the event loop. Calls go to a small dedicated pool (bcrypt releases the GIL
+# while it works, so threads run in parallel); once PASSWORD_HASH_MAX_PENDING calls are
+# queued or running, new ones are turned away with a 503 instead of piling up.
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_stats_lock = threading.Lock()
+_stats = {"pending": 0, "running": 0, "completed": 0, "rejected": 0, "rehashed": 0, "wait_ms": 0.0, "work_ms": 0.0}
+
+def _track(func, *args):
+    queued_at = time.monotonic()
+
+    def run():
+        started = time.monotonic()
+        with _stats_lock:
+            _stats["running"] += 1
+        try:
+            return func(*args)
+        finally:
+            finished = time.monotonic()
+            with _stats_lock:
+                _stats["running"] -= 1
+                _stats["pending"] -= 1
+                _stats["completed"] += 1
+                _stats["wait_ms"] += (started - queued_at) * 1000
+                _stats["work_ms"] += (finished - started) * 1000
+    return run
+
+def _submit(func, *args):
+    with _stats_lock:
+        if _stats["pending"] >= PASSWORD_HASH_MAX_PENDING:
+            _stats["rejected"] += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Server is busy, please try again shortly")
+        _stats["pending"] += 1
+    try:
+        return _executor.submit(_track(func, *args))
+    except Exception:
+        with _stats_lock:
+            _stats["pending"] -= 1
+        raise
+
+def _hash(plain: str) -> str:
+    return bcrypt.hashpw(plain.encode("utf-8"), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
+
+def _check(plain: str, hashed: str) -> bool:
+    try:
+        return bcrypt.checkpw(plain.encode("utf-8"), hashed.encode("utf-8"))
+    except ValueError:
+        # Malformed stored hash
+        return False
+
+async def hash_password(plain: str) -> str:
+    """Hashes a password with the configured work factor, off the event loop."""
+    return await asyncio.wrap_future(_submit(_hash, plain))
+
+async def verify_password(plain: str, hashed: str) -> bool:
+    return await asyncio.wrap_future(_submit(_check, plain, hashed))
+
+def hash_password_sync(plain: str) -> str:
+    """For sync handlers, which already run in the threadpool but should share the bound."""
+    return _submit(_hash, plain).result()
+
+def verify_password_sync(plain: str, hashed: str) -> bool:
+    return _submit(_check, plain, hashed).result()
+
+def needs_rehash(hashed: str) -> bool:
+    """True if a stored hash ("$2b$<cost>$...") was made with a different work factor."""
+    try:
+        return int(hashed.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+async def verify_and_upgrade(collection, user: dict, plain: str) -> bool:
+    """
+    Checks a login password and, when it matches a hash made with an older work factor,
+    replaces the stored hash with one made with BCRYPT_ROUNDS. The update only applies
+    if the password was not changed in the meantime.
+    """
+    hashed = user["password"]
+    if not await verify_password(plain, hashed):
+        return False
+    if needs_rehash(hashed):
+        try:
+            new_hash = await hash_password(plain)
+            collection.update_one({"_id": user["_id"], "password": hashed}, {"$set": {"password": new_hash}})
+            with _stats_lock:
+                _stats["rehashed"] += 1
+        except Exception as e:
+            logger.warning(f"Failed to upgrade password hash for {user['_id']}: {e}")
+    return True
+
+def password_hash_metrics() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    completed = stats.pop("completed")
+    wait_ms, work_ms = stats.pop("wait_ms"), stats.pop("work_ms")
+    return {
+        **stats,
+        "queued": stats["pending"] - stats["running"],
+        "completed": completed,
+        "avg_wait_ms": round(wait_ms / completed, 1) if completed else 0.0,
+        "avg_work_ms": round(work_ms / completed, 1) if completed else 0.0,
+        "workers": PASSWORD_HASH_WORKERS,
+        "rounds": BCRYPT_ROUNDS,
+    }
+
+register_metrics("password_hashing", password_hash_metrics)
@@ -0,0 +1,88 @@
+# app/utils/projection_utils.py
+
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple, Type
+from bson import ObjectId
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ConfigDict, create_model
+
+def model_projection(model: Type[BaseModel], fields: Optional[Iterable[str]] = None) -> dict:
+    """
+    Builds a Mongo projection that reads only the stored keys backing the given model
+    fields (all of the model's fields when `fields` is None).
+    """
+    projection = {}
+    for name, field in model.model_fields.items():
+        if fields is None or name in fields:
+            projection[field.alias or name] = 1
+    projection.setdefault("_id", 1)
+    return projection
+
+@lru_cache(maxsize=256)
+def partial_model(model: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """
+    Returns a response model containing only `fields` of `model`. The generated
+    classes are cached, so each distinct field set is only built once.
+    """
+    definitions = {
+        name: (field.annotation, field)
+        for name, field in model.model_fields.items()
+        if name in fields
+    }
+    return create_model(
+        f"{model.__name__}Fields",
+        __config__=ConfigDict(populate_by_name=True, json_encoders={ObjectId: str}),
+        **definitions
+    )
+
+def resolve_fieldset(
+    model: Type[BaseModel],
+    fields: Optional[str],
+    view: Optional[str],
+    views: Dict[str, Tuple[dict, Type[BaseModel]]],
+    include: Iterable[str] = ()
+) -> Optional[Tuple[dict, Type[BaseModel]]]:
+    """
+    Turns the `fields=` / `view=` query parameters into a (projection, response model)
+    pair. Returns None when neither is given so callers keep their full-document path.
+    `include` lists stored keys that must always be read (e.g. the pagination sort key).
+    """
+    if fields and view:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Use either 'fields' or 'view', not both.")
+
+    if view:
+        if view not in views:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown view '{view}'.")
+        projection, view_model = views[view]
+        projection = dict(projection)
+    elif fields:
+        requested = {f.strip() for f in fields.split(",") if f.strip()}
+        unknown = requested - set(model.model_fields)
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown field(s): {', '.join(sorted(unknown))}."
+            )
+        requested.add("id")
+        view_model = partial_model(model, tuple(sorted(requested)))
+        projection = model_projection(model, requested)
+    else:
+        return None
+
+    for key in include:
+        projection.setdefault(key, 1)
+    return projection, view_model
+
+def fieldset_response(items, next_cursor: Optional[str] = None, paged: bool = False) -> JSONResponse:
+    """
+    Serializes lightweight models (a single model or a list of them) directly,
+    bypassing the route's full response_model.
+    """
+    if isinstance(items, BaseModel):
+        return JSONResponse(content=jsonable_encoder(items.model_dump(mode="json", by_alias=True)))
+    content = [item.model_dump(mode="json", by_alias=True) for item in items]
+    if paged:
+        content = {"items": content, "next_cursor": next_cursor}
+    return JSONResponse(content=jsonable_encoder(content))
@@ -0,0 +1,169 @@
+# app/utils/rollup_utils.py
+
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from bson import ObjectId
+from pymongo import DeleteMany, ReplaceOne
+from app.database.database import db
+from app.utils.availability_utils import ACTIVE_WINDOW
+from app.utils.history_utils import history_partitions, partition_name, union_stages
+from app.utils.lease_utils import ensure_lease
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_ID = "utilization"
+# Lower-bound overlap for the change scan, so writes that commit while a run is reading
+# are picked up by the next one. Recomputing a day is idempotent.
+WATERMARK_OVERLAP = timedelta(minutes=5)
+DAY = timedelta(days=1)
+
+def day_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, moment.day)
+
+def assignment_span(doc: dict, now: datetime) -> Tuple[datetime, datetime]:
+    """The interval an assignment actually kept its truck and driver busy."""
+    start = doc["assignment_date"]
+    end = doc.get("completed_at") or min(now, start + ACTIVE_WINDOW)
+    return start, max(start, end)
+
+def span_days(start: datetime, end: datetime) -> List[datetime]:
+    days = [day_start(start)]
+    while days[-1] + DAY < end:
+        days.append(days[-1] + DAY)
+    return days
+
+def _source_collections(partitions: Optional[Iterable[str]] = None) -> list:
+    return [db.assignments] + [db[name] for name in (partitions if partitions is not None else history_partitions())]
+
+def dirty_days(watermark: Optional[datetime], now: datetime) -> Set[Tuple[ObjectId, datetime]]:
+    """
+    (company_id, day) pairs whose buckets may have changed since `watermark`: days
+    spanned by assignments written since then (created, completed or compacted, in the
+    hot collection or a partition), plus days of assignments that were active at any
+    point since then, whose active hours grow with time alone. With no watermark yet,
+    every day with data is dirty.
+    """
+    projection = {"company_id": 1, "assignment_date": 1, "completed_at": 1}
+    changed = {} if watermark is None else {"updated_at": {"$gt": watermark - WATERMARK_OVERLAP}}
+    docs = [doc for collection in _source_collections() for doc in collection.find(changed, projection)]
+    if watermark is not None:
+        docs.extend(db.assignments.find(
+            {"status": "active", "assignment_date": {"$gte": watermark - WATERMARK_OVERLAP - ACTIVE_WINDOW}},
+            projection
+        ))
+    dirty = set()
+    for doc in docs:
+        for day in span_days(*assignment_span(doc, now)):
+            dirty.add((doc["company_id"], day))
+    return dirty
+
+def _date_ranges(days: Iterable[datetime]) -> List[Tuple[datetime, datetime]]:
+    """Merged assignment_date ranges that can hold assignments overlapping any of `days`."""
+    ranges = []
+    for day in sorted(days):
+        start, end = day - ACTIVE_WINDOW, day + DAY
+        if ranges and start <= ranges[-1][1]:
+            ranges[-1] = (ranges[-1][0], max(ranges[-1][1], end))
+        else:
+            ranges.append((start, end))
+    return ranges
+
+def _months(start: datetime, end: datetime) -> Set[str]:
+    names, month = set(), datetime(start.year, start.month, 1)
+    while month < end:
+        names.add(partition_name(month))
+        month = datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+    return names
+
+def _company_assignments(company_id: ObjectId, days: Iterable[datetime], partitions: List[str]) -> List[dict]:
+    """
+    Every assignment of a company whose span can overlap one of `days`, read with one
+    aggregation over the hot collection and the partitions of the months involved.
+    """
+    ranges = _date_ranges(days)
+    match = {"$or": [{"assignment_date": {"$gte": start, "$lt": end}} for start, end in ranges]}
+    months = set().union(*(_months(start, end) for start, end in ranges))
+    pipeline = [
+        {"$match": {"company_id": company_id, **match}},
+        *union_stages([p for p in partitions if p in months], company_id, match)
+    ]
+    return list(db.assignments.aggregate(pipeline))
+
+def build_day_buckets(company_id: ObjectId, day: datetime, docs: Iterable[dict], now: datetime) -> List[dict]:
+    """
+    Per-truck and per-driver buckets for one day: hours on assignment within the day,
+    trips started that day, and counts of load types and origin/destination pairs.
+    """
+    buckets: Dict[Tuple[str, ObjectId], dict] = {}
+    day_end = day + DAY
+    for doc in docs:
+        start, end = assignment_span(doc, now)
+        overlap = (min(end, day_end) - max(start, day)).total_seconds()
+        started_today = day <= start < day_end
+        if overlap <= 0 and not started_today:
+            continue
+        for kind, field in (("truck", "truck_id"), ("driver", "driver_id")):
+            resource_id = doc.get(field)
+            if resource_id is None:
+                continue
+            bucket = buckets.setdefault((kind, resource_id), {
+                "company_id": company_id, "day": day, "kind": kind, "resource_id": resource_id,
+                "active_hours": 0.0, "trips": 0,
+                "load_types": defaultdict(int), "routes": defaultdict(int)
+            })
+            bucket["active_hours"] += max(overlap, 0) / 3600
+            if started_today:
+                bucket["trips"] += 1
+                bucket["load_types"][doc.get("type_of_load") or "unspecified"] += 1
+                bucket["routes"][(doc.get("origin"), doc.get("destination"))] += 1
+
+    # Load types and places are free text, so they are stored as arrays, not as keys.
+    for bucket in buckets.values():
+        bucket["active_hours"] = round(bucket["active_hours"], 2)
+        bucket["load_types"] = [{"type": t, "count": n} for t, n in sorted(bucket["load_types"].items())]
+        bucket["routes"] = [
+            {"origin": o, "destination": d, "count": n}
+            for (o, d), n in sorted(bucket["routes"].items(), key=lambda item: -item[1])
+        ]
+        bucket["updated_at"] = now
+    return list(buckets.values())
+
+def run_utilization_rollup() -> int:
+    """
+    Recomputes the daily buckets of every dirty (company, day) from the source records,
+    then advances the watermark. Each company's dirty days are read with one aggregation
+    and written with one bulk_write: buckets are upserted in place and only then are the
+    ones no longer produced (older updated_at) removed, so readers never see a day
+    empty. Returns the number of days rebuilt.
+    """
+    now = datetime.utcnow()
+    state = db.rollup_state.find_one({"_id": ROLLUP_ID}) or {}
+    days = dirty_days(state.get("watermark"), now)
+    partitions = history_partitions()
+    by_company: Dict[ObjectId, Set[datetime]] = defaultdict(set)
+    for company_id, day in days:
+        by_company[company_id].add(day)
+
+    for company_id, company_days in by_company.items():
+        ensure_lease()
+        docs_by_day: Dict[datetime, List[dict]] = defaultdict(list)
+        for doc in _company_assignments(company_id, company_days, partitions):
+            for day in span_days(*assignment_span(doc, now)):
+                if day in company_days:
+                    docs_by_day[day].append(doc)
+        operations = []
+        for day in sorted(company_days):
+            for bucket in build_day_buckets(company_id, day, docs_by_day[day], now):
+                key = {"company_id": company_id, "day": day, "kind": bucket["kind"], "resource_id": bucket["resource_id"]}
+                operations.append(ReplaceOne(key, bucket, upsert=True))
+        operations.append(DeleteMany({"company_id": company_id, "day": {"$in": list(company_days)}, "updated_at": {"$lt": now}}))
+        db.utilization_daily.bulk_write(operations, ordered=True)
+    db.rollup_state.update_one(
+        {"_id": ROLLUP_ID},
+        {"$set": {"watermark": now, "last_days_rebuilt": len(days)}},
+        upsert=True
+    )
+    logger.info(f"Rollup: Rebuilt utilization buckets for {len(days)} company-days.")
+    return len(days)
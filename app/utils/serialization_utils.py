@@ -0,0 +1,99 @@
+# app/utils/serialization_utils.py
+
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Callable, Iterable, Optional, Type, Union, get_args, get_origin
+from bson import ObjectId
+from fastapi import Response
+from pydantic import BaseModel
+import orjson
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(value) -> bytes:
+    """
+    Encodes BSON-derived data straight to JSON bytes: ObjectId becomes its hex string,
+    dates and datetimes become ISO 8601 strings.
+    """
+    return orjson.dumps(value, default=_default)
+
+def _unwrap_optional(annotation):
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+def _converter_for(annotation) -> Optional[Callable]:
+    annotation = _unwrap_optional(annotation)
+    origin = get_origin(annotation)
+    if origin in (list, Iterable):
+        (item,) = get_args(annotation) or (None,)
+        convert = _converter_for(item) if item is not None else None
+        return (lambda values: [convert(v) if v is not None else v for v in values]) if convert else None
+    if not isinstance(annotation, type):
+        return None
+    if issubclass(annotation, BaseModel):
+        return document_shaper(annotation)
+    if issubclass(annotation, date) and not issubclass(annotation, datetime):
+        return lambda v: v.date() if isinstance(v, datetime) else v
+    if annotation is float:
+        return float
+    return None
+
+@lru_cache(maxsize=None)
+def document_shaper(model: Type[BaseModel]) -> Callable[[dict], dict]:
+    """
+    Compiles `model` into a function that reshapes a trusted Mongo document into exactly
+    what `model(**doc).model_dump(by_alias=True)` would produce: the model's keys in
+    field order, defaults for missing optional fields and `date` fields narrowed from
+    the datetimes Mongo returns. No validation is performed.
+    """
+    plan = []
+    for name, field in model.model_fields.items():
+        key = field.alias or name
+        plan.append((key, name, _converter_for(field.annotation), field))
+
+    def shape(doc: dict) -> dict:
+        out = {}
+        for key, name, convert, field in plan:
+            if key in doc:
+                value = doc[key]
+            elif name in doc:
+                value = doc[name]
+            else:
+                value = field.get_default(call_default_factory=True)
+            out[key] = convert(value) if convert is not None and value is not None else value
+        return out
+
+    return shape
+
+def model_json_encoder(model: Type[BaseModel]) -> Callable[[dict], bytes]:
+    """
+    Per-document encoder for streaming: reshapes with the compiled model plan and encodes.
+    """
+    shape = document_shaper(model)
+    return lambda doc: dumps(shape(doc))
+
+def trusted_response(model: Type[BaseModel], docs, status_code: int = 200) -> Response:
+    """
+    Returns documents read from our own database as JSON without re-validating them.
+    Returning a Response also makes FastAPI skip the route's response_model pass, while
+    the declared response_model still drives the OpenAPI schema.
+    """
+    shape = document_shaper(model)
+    if isinstance(docs, dict):
+        content = shape(docs)
+    else:
+        content = [shape(doc) for doc in docs]
+    return Response(content=dumps(content), status_code=status_code, media_type="application/json")
+
+def trusted_page_response(model: Type[BaseModel], docs: list, next_cursor: Optional[str]) -> Response:
+    shape = document_shaper(model)
+    content = {"items": [shape(doc) for doc in docs], "next_cursor": next_cursor}
+    return Response(content=dumps(content), media_type="application/json")
@@ -0,0 +1,22 @@
+# app/utils/sms_utils.py
+import logging
+from app.config import TWILIO_SMS_FROM
+from app.utils.otp_utils import client
+
+logger = logging.getLogger(__name__)
+
+def send_sms(phone: str, body: str) -> bool:
+    """
+    Sends a plain text message through the shared Twilio client.
+    Returns False (and logs) instead of raising, like the email helpers.
+    """
+    if not TWILIO_SMS_FROM:
+        logger.warning("TWILIO_SMS_FROM is not configured; SMS not sent.")
+        return False
+    try:
+        message = client.messages.create(to=phone, from_=TWILIO_SMS_FROM, body=body)
+        logger.info(f"SMS sent to {phone} | SID: {message.sid}")
+        return True
+    except Exception as e:
+        logger.error(f"Twilio Error sending SMS to {phone}: {str(e)}")
+        return False
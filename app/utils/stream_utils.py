@@ -0,0 +1,60 @@
+# app/utils/stream_utils.py
+
+from typing import Callable, Iterable, Iterator
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+
+STREAM_BATCH_SIZE = 500
+STREAM_FORMATS = ["ndjson", "json"]
+
+def _batched(docs: Iterable, encode: Callable[[dict], bytes]) -> Iterator[list]:
+    """
+    Encodes documents as they come off the cursor and groups them into batches,
+    so each write to the socket carries many rows but memory stays bounded.
+    """
+    batch = []
+    for doc in docs:
+        batch.append(encode(doc))
+        if len(batch) >= STREAM_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def iter_ndjson(docs: Iterable, encode: Callable[[dict], bytes]) -> Iterator[bytes]:
+    for batch in _batched(docs, encode):
+        yield b"\n".join(batch) + b"\n"
+
+def iter_json_array(docs: Iterable, encode: Callable[[dict], bytes]) -> Iterator[bytes]:
+    yield b"["
+    first = True
+    for batch in _batched(docs, encode):
+        chunk = b",".join(batch)
+        yield chunk if first else b"," + chunk
+        first = False
+    yield b"]"
+
+def stream_documents(docs: Iterable, encode: Callable[[dict], bytes], fmt: str) -> StreamingResponse:
+    """
+    Streams a Mongo cursor as NDJSON or as a chunked JSON array. The generator is
+    synchronous, so Starlette drives it from its threadpool and the blocking cursor
+    reads never run on the event loop.
+    """
+    if fmt == "ndjson":
+        return StreamingResponse(iter_ndjson(docs, encode), media_type="application/x-ndjson")
+    return StreamingResponse(iter_json_array(docs, encode), media_type="application/json")
+
+def ensure_streamable(stream: str, limit, cursor):
+    if stream and (limit is not None or cursor is not None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Streaming cannot be combined with 'limit' or 'cursor'."
+        )
+
+def model_encoder(model) -> Callable[[dict], bytes]:
+    """
+    Returns an encoder that validates a raw document with `model` and dumps it as JSON bytes.
+    """
+    def encode(doc: dict) -> bytes:
+        return model.model_validate(doc).model_dump_json(by_alias=True).encode("utf-8")
+    return encode
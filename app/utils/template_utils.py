@@ -0,0 +1,87 @@
+# app/utils/template_utils.py
+
+import time
+from datetime import datetime
+from html import escape
+from string import Formatter
+from typing import Dict, Iterable, Optional, Tuple
+from markupsafe import Markup
+
+# A minimal template engine for the HTML emails. Templates use str.format placeholders
+# ({name}, {name.key}, {name:spec}) and are parsed once, when they are registered, into
+# literal text and field lookups. Rendering only walks that list: every value is
+# HTML-escaped unless it is already Markup (such as another rendered template), and a
+# template can be wrapped in a registered layout that supplies the shared header/footer.
+
+class Template:
+    __slots__ = ("name", "_parts")
+
+    def __init__(self, name: str, source: str):
+        self.name = name
+        parts = []
+        for literal, field, spec, conversion in Formatter().parse(source):
+            if literal:
+                if parts and isinstance(parts[-1], str):
+                    parts[-1] += literal
+                else:
+                    parts.append(literal)
+            if field is not None:
+                if not field or conversion:
+                    raise ValueError(f"Template {name}: unsupported placeholder {{{field}}}")
+                parts.append((tuple(field.split(".")), spec))
+        self._parts = tuple(parts)
+
+    def render(self, context: dict) -> Markup:
+        out = []
+        append = out.append
+        for part in self._parts:
+            if part.__class__ is str:
+                append(part)
+                continue
+            path, spec = part
+            value = context[path[0]]
+            for key in path[1:]:
+                value = value[key]
+            if spec:
+                value = format(value, spec)
+            if isinstance(value, Markup):
+                append(value)
+            else:
+                append(escape(value if value.__class__ is str else str(value)))
+        return Markup("".join(out))
+
+_templates: Dict[str, Tuple[Template, Optional[str]]] = {}
+
+def register_template(name: str, source: str, layout: Optional[str] = None):
+    """Compiles `source` and registers it under `name`, optionally wrapped in `layout`."""
+    _templates[name] = (Template(name, source), layout)
+
+def render_fragment(name: str, **context) -> Markup:
+    """Renders a template on its own, for embedding in another one."""
+    return _templates[name][0].render(context)
+
+def render_each(name: str, rows: Iterable[dict]) -> Markup:
+    """Renders a fragment once per row and joins the results."""
+    template = _templates[name][0]
+    return Markup("".join([template.render(row) for row in rows]))
+
+def render_template(name: str, **context) -> str:
+    """Renders a registered template inside its layout, which receives it as {content}."""
+    template, layout = _templates[name]
+    html = template.render(context)
+    while layout is not None:
+        template, next_layout = _templates[layout]
+        html = template.render({**context, "content": html, "year": current_year()})
+        layout = next_layout
+    return str(html)
+
+_year_cache = (0, 0.0)
+
+def current_year() -> int:
+    """The local calendar year, looked up again only once the cached one has ended."""
+    global _year_cache
+    year, valid_until = _year_cache
+    if time.time() >= valid_until:
+        year = datetime.now().year
+        _year_cache = (year, datetime(year + 1, 1, 1).timestamp())
+    return year
@@ -0,0 +1,73 @@
+# app/utils/version_utils.py
+
+import hashlib
+from typing import Iterable, Optional
+from bson import ObjectId
+from fastapi import HTTPException, Request, Response, status
+from pymongo import UpdateOne
+from app.database.database import db
+
+def bump_version(company_id: ObjectId, *resources: str):
+    """
+    Increments the data version of each resource for one company. Every write path
+    that changes what a GET for that resource would return must call this.
+    """
+    db.data_versions.update_one(
+        {"_id": ObjectId(company_id)},
+        {"$inc": {resource: 1 for resource in resources}},
+        upsert=True
+    )
+
+def bump_versions(company_ids: Iterable[ObjectId], *resources: str):
+    """Bulk variant of bump_version for jobs that touch many companies at once."""
+    operations = [
+        UpdateOne({"_id": ObjectId(cid)}, {"$inc": {resource: 1 for resource in resources}}, upsert=True)
+        for cid in set(company_ids)
+    ]
+    if operations:
+        db.data_versions.bulk_write(operations, ordered=False)
+
+def read_versions(company_id: ObjectId) -> dict:
+    """The company's current data versions, keyed by resource (missing = 0)."""
+    return db.data_versions.find_one({"_id": ObjectId(company_id)}) or {}
+
+def make_etag(company_id: ObjectId, resources: Iterable[str], variant: str = "", versions: Optional[dict] = None) -> str:
+    """
+    Builds a weak ETag from the company's current versions of `resources` and a
+    variant string (the query string, plus anything else the response depends on).
+    Pass `versions` when they were already read, so the ETag matches what the handler
+    goes on to serve.
+    """
+    if versions is None:
+        versions = read_versions(company_id)
+    raw = f"{company_id}|" + "|".join(f"{r}={versions.get(r, 0)}" for r in resources) + f"|{variant}"
+    return f'W/"{hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]}"'
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+def check_etag(request: Request, company_id: ObjectId, resources: Iterable[str], variant: str = "", versions: Optional[dict] = None) -> str:
+    """
+    Computes the ETag for a company-scoped GET and answers 304 Not Modified straight
+    away when the client's If-None-Match matches, before any data query runs.
+    Returns the ETag so the handler can attach it to its response.
+    """
+    etag = make_etag(company_id, resources, f"{request.url.path}?{request.url.query}|{variant}", versions)
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return etag
+
+def with_etag(response: Response, etag: str) -> Response:
+    response.headers["ETag"] = etag
+    return response
@@ -8,7 +8,10 @@ from app.routes.recovery import router as recovery_router
 from app.routes.trucks import router as trucks_router
 from app.routes.drivers import router as drivers_router
 from app.routes.assignments import router as assignments_router
+from app.routes.analytics import router as analytics_router
 from app.scheduler import scheduler
+from app.database.database import ensure_indexes
+from app.utils.outbox_utils import start_email_workers, stop_email_workers
 
 app = FastAPI(
     
@@ -19,13 +22,16 @@ app = FastAPI(
 
 @app.on_event("startup")
 async def startup_event():
-    """Start the scheduler on app startup."""
+    """Create indexes and start the scheduler and email workers on app startup."""
+    ensure_indexes()
     scheduler.start()
+    start_email_workers()
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    """Stop the scheduler on app shutdown."""
+    """Stop the scheduler and email workers on app shutdown."""
     scheduler.shutdown()
+    stop_email_workers()
 
 @app.get("/")
 def read_root():
@@ -38,4 +44,5 @@ app.include_router(company_router, prefix="/company", tags=["Company"])
 app.include_router(recovery_router, prefix="/recovery", tags=["Account Recovery"])
 app.include_router(trucks_router, prefix="/trucks", tags=["Truck Management"])
 app.include_router(drivers_router, prefix="/drivers", tags=["Driver Management"]) 
-app.include_router(assignments_router, prefix="/assignments", tags=["Assignments"])
\ No newline at end of file
+app.include_router(assignments_router, prefix="/assignments", tags=["Assignments"])
+app.include_router(analytics_router, prefix="/analytics", tags=["Analytics"])
\ No newline at end of file
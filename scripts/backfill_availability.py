@@ -0,0 +1,46 @@
+"""
+One-off backfill for `active_assignment_id` and `assigned_until` on trucks and drivers.
+
+Assignments created before these fields existed were stored with the request aliases
+(`truckId`/`driverId`); those keys are renamed to `truck_id`/`driver_id` first. Every
+truck and driver is then marked free and re-pointed at its active assignment, if any.
+Safe to re-run.
+
+Usage: python scripts/backfill_availability.py
+"""
+from pymongo import MongoClient, UpdateOne
+from datetime import timedelta
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+client = MongoClient(os.getenv("MONGO_URI"))
+db = client[os.getenv("MONGO_DB")]
+active_window = timedelta(hours=int(os.getenv("ASSIGNMENT_ACTIVE_HOURS", "24")))
+
+renamed = db.assignments.update_many(
+    {"truckId": {"$exists": True}},
+    {"$rename": {"truckId": "truck_id", "driverId": "driver_id"}}
+)
+print(f"Renamed alias keys on {renamed.modified_count} assignments.")
+
+free = {"$set": {"active_assignment_id": None, "assigned_until": None}}
+db.trucks.update_many({}, free)
+db.drivers.update_many({}, free)
+
+truck_ops, driver_ops = [], []
+for a in db.assignments.find({"status": "active"}, {"truck_id": 1, "driver_id": 1, "assignment_date": 1}).sort("assignment_date", 1):
+    held = {"$set": {"active_assignment_id": a["_id"], "assigned_until": a["assignment_date"] + active_window}}
+    truck_ops.append(UpdateOne({"_id": a["truck_id"]}, held))
+    driver_ops.append(UpdateOne({"_id": a["driver_id"]}, held))
+
+if truck_ops:
+    db.trucks.bulk_write(truck_ops, ordered=False)
+    db.drivers.bulk_write(driver_ops, ordered=False)
+print(f"Marked resources for {len(truck_ops)} active assignments.")
+
+for resources in (db.trucks, db.drivers):
+    resources.create_index([("company_id", 1), ("active_assignment_id", 1)])
+    resources.create_index([("company_id", 1), ("assigned_until", 1)])
+print("Availability indexes ensured.")
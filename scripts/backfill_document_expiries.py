@@ -0,0 +1,32 @@
+"""
+One-off backfill for `document_expiries` on trucks and drivers.
+
+The daily expiry reminder job scans this flat list of {doc, date} pairs (one entry per
+dated truck document or license validity) instead of the nested documents. Trucks and
+drivers saved before the field existed get it computed here. Safe to re-run.
+
+Usage: python scripts/backfill_document_expiries.py
+"""
+import os
+import sys
+from pymongo import UpdateOne
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.database import db
+from app.utils.expiry_utils import truck_expiries, driver_expiries
+
+for collection, source, build in (
+    (db.trucks, "documents", truck_expiries),
+    (db.drivers, "license", driver_expiries),
+):
+    ops = []
+    for resource in collection.find({}, {source: 1}):
+        ops.append(UpdateOne({"_id": resource["_id"]}, {"$set": {"document_expiries": build(resource.get(source) or {})}}))
+        if len(ops) == 1000:
+            collection.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        collection.bulk_write(ops, ordered=False)
+    collection.create_index([("document_expiries.date", 1)])
+    print(f"Backfilled document_expiries on {collection.name}.")
@@ -0,0 +1,52 @@
+"""
+One-off backfill for the `identities` login lookup.
+
+Login, OTP verification and password reset resolve a username or email through this
+collection (one entry per normalized identifier, pointing at an admin or company), so
+every existing account must be indexed before IDENTITY_LEGACY_LOOKUP is turned off.
+
+Identifiers are matched case-insensitively. Accounts whose usernames or emails differ
+only by case would share an entry, so they are reported first and nothing is written
+until they are renamed; pass --skip-conflicts to index everything else and leave those
+identifiers out (the accounts can still log in with their other identifier). Safe to
+re-run.
+
+Usage: python scripts/backfill_identities.py [--skip-conflicts]
+"""
+import os
+import sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.database import db
+from app.utils.identity_utils import COLLECTIONS, normalize_identifier
+
+owners = defaultdict(set)
+for role, collection in COLLECTIONS.items():
+    for doc in db[collection].find({}, {"username": 1, "email": 1}):
+        for field in ("username", "email"):
+            ident = normalize_identifier(doc.get(field))
+            if ident:
+                owners[ident].add((role, doc["_id"]))
+
+conflicts = {ident: found for ident, found in owners.items() if len(found) > 1}
+for ident, found in sorted(conflicts.items()):
+    accounts = ", ".join(f"{role} {owner_id}" for role, owner_id in sorted(found, key=str))
+    print(f"Conflict: {ident!r} is used by {accounts}")
+if conflicts and "--skip-conflicts" not in sys.argv:
+    print(f"{len(conflicts)} identifier(s) differ only by case. Rename them or re-run with --skip-conflicts.")
+    sys.exit(1)
+
+db.identities.create_index([("role", 1), ("owner_id", 1)])
+indexed = 0
+for ident, found in owners.items():
+    if ident in conflicts:
+        db.identities.delete_one({"_id": ident})
+        continue
+    role, owner_id = next(iter(found))
+    db.identities.replace_one({"_id": ident}, {"role": role, "owner_id": owner_id}, upsert=True)
+    indexed += 1
+# Identifiers no account carries any more
+stale = db.identities.delete_many({"_id": {"$nin": list(owners)}}).deleted_count
+print(f"Indexed {indexed} identifier(s), skipped {len(conflicts)} conflict(s), removed {stale} stale entr(ies).")
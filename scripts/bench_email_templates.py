@@ -0,0 +1,57 @@
+"""
+Measures how fast the truck-added email renders: a seven-document truck through the
+compiled template registry (layout, document cards, detail rows and escaping). This is
+the HTML built per truck during bulk onboarding; attachments and sending are excluded.
+
+Usage: python scripts/bench_email_templates.py [renders ...]   (default: 1000 10000)
+No database or SendGrid credentials are needed; the truck is synthesised in memory.
+"""
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.utils.email_utils import truck_added_html
+
+def make_truck() -> dict:
+    def doc(name):
+        return {
+            "number": f"{name.upper()}000123",
+            "issue_date": datetime(2024, 1, 1),
+            "expiry_date": datetime(2026, 1, 1),
+            "s3_url": f"https://bucket.s3.ap-south-1.amazonaws.com/company/MH12AB1234/{name}",
+        }
+    documents = {name: doc(name) for name in ["rc", "puc", "tax", "insurance", "national_permit", "state_permit"]}
+    documents["fitness"] = {
+        "number": "FIT000123",
+        "application_no": "APP000123",
+        "issue_date": datetime(2024, 1, 1),
+        "main_expiry_date": datetime(2026, 1, 1),
+        "next_inspection_due_date": datetime(2025, 6, 1),
+        "s3_url": "https://bucket.s3.ap-south-1.amazonaws.com/company/MH12AB1234/fitness",
+    }
+    return {
+        "truck_number": "MH12AB1234",
+        "model_number": "Tata <Signa> 4825.TK",
+        "engine_number": "ENG123456",
+        "chassis_number": "CHS123456",
+        "registration_date": datetime(2020, 1, 1),
+        "tire_count": 10,
+        "truck_photo_url": "https://bucket.s3.ap-south-1.amazonaws.com/company/MH12AB1234/photo.jpg",
+        "documents": documents,
+    }
+
+def bench(renders: int):
+    truck = make_truck()
+    truck_added_html("Acme Logistics & Co", truck, [])
+    start = time.perf_counter()
+    for _ in range(renders):
+        html = truck_added_html("Acme Logistics & Co", truck, [])
+    elapsed = time.perf_counter() - start
+    print(f"{renders:>7} renders  {elapsed:8.3f}s  {renders / elapsed:10.0f} renders/s  {len(html) / 1024:.1f} KiB each")
+
+if __name__ == "__main__":
+    for renders in [int(arg) for arg in sys.argv[1:]] or [1000, 10000]:
+        bench(renders)
@@ -0,0 +1,90 @@
+"""
+Compares the current truck list serialization path against the trusted fast path.
+
+Current path: TruckOut(**doc) in the route, then FastAPI's response_model pass
+(dump -> validate again -> JSON mode dump -> json.dumps).
+Fast path:    app.utils.serialization_utils.trusted_response (reshape + orjson).
+
+Usage: python scripts/bench_serialization.py [count ...]   (default: 1000 10000)
+No database is needed; documents are synthesised in memory.
+"""
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bson import ObjectId
+from pydantic import TypeAdapter
+from app.models.truck import TruckOut
+from app.utils.serialization_utils import document_shaper, dumps
+
+def make_truck_doc(i: int, company_id: ObjectId) -> dict:
+    def doc(name):
+        return {
+            "number": f"{name.upper()}{i:06d}",
+            "issue_date": datetime(2024, 1, 1),
+            "expiry_date": datetime(2026, 1, 1),
+            "s3_url": f"https://bucket.s3.ap-south-1.amazonaws.com/{company_id}/MH{i:06d}/{name}",
+        }
+    documents = {name: doc(name) for name in ["rc", "puc", "tax", "insurance", "national_permit", "state_permit"]}
+    documents["fitness"] = {
+        "number": f"FIT{i:06d}",
+        "application_no": f"APP{i:06d}",
+        "issue_date": datetime(2024, 1, 1),
+        "main_expiry_date": datetime(2026, 1, 1),
+        "next_inspection_due_date": datetime(2025, 6, 1),
+        "s3_url": f"https://bucket.s3.ap-south-1.amazonaws.com/{company_id}/MH{i:06d}/fitness",
+    }
+    return {
+        "_id": ObjectId(),
+        "truck_number": f"MH{i:06d}",
+        "model_number": "TATA 4018",
+        "engine_number": f"ENG{i:08d}",
+        "chassis_number": f"CHS{i:08d}",
+        "registration_date": datetime(2020, 5, 17),
+        "tire_count": 10,
+        "truck_photo_url": f"https://bucket.s3.ap-south-1.amazonaws.com/{company_id}/MH{i:06d}/photo.jpg",
+        "company_id": company_id,
+        "documents": documents,
+        "emi_details": None,
+        "created_at": datetime.utcnow(),
+    }
+
+adapter = TypeAdapter(List[TruckOut])
+
+def current_path(docs: list) -> bytes:
+    models = [TruckOut(**doc) for doc in docs]
+    dumped = [m.model_dump(by_alias=True) for m in models]
+    validated = adapter.validate_python(dumped)
+    content = adapter.dump_python(validated, mode="json", by_alias=True)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def fast_path(docs: list) -> bytes:
+    shape = document_shaper(TruckOut)
+    return dumps([shape(doc) for doc in docs])
+
+def best_of(fn, docs, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(docs)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main(counts: List[int]):
+    company_id = ObjectId()
+    print(f"{'trucks':>8} {'current (ms)':>14} {'fast (ms)':>11} {'speedup':>9} {'bytes':>11}")
+    for count in counts:
+        docs = [make_truck_doc(i, company_id) for i in range(count)]
+        assert json.loads(current_path(docs)) == json.loads(fast_path(docs))
+        current = best_of(current_path, docs)
+        fast = best_of(fast_path, docs)
+        size = len(fast_path(docs))
+        print(f"{count:>8} {current * 1000:>14.1f} {fast * 1000:>11.1f} {current / fast:>8.1f}x {size:>11}")
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000])
@@ -0,0 +1,23 @@
+"""
+One-off migration that moves existing history records out of `assignments` into the
+monthly assignments_history_YYYYMM partitions. The compaction job does the same in
+small batches; this drains the backlog in one go. Safe to re-run.
+
+Usage: python scripts/partition_assignment_history.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.utils.history_utils import move_history_batch
+
+BATCH_SIZE = 1000
+
+total = 0
+while True:
+    moved = move_history_batch(BATCH_SIZE)
+    total += moved
+    if moved < BATCH_SIZE:
+        break
+print(f"Moved {total} history records into monthly partitions.")